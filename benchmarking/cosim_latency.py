@@ -0,0 +1,356 @@
+'''
+Scriptable version of the cosimulation latency benchmark in `cosim_latency.ipynb`. Every round, an attitude is produced
+and the previous round's estimated magnetic field is consumed over a cosimulation channel, and the round trip of each
+produce/consume pair is timed.
+
+The channel is pluggable: by default it is opened on a new simulation of the SuperDove scenario configured in
+`config.json`, and with `--local` it is an in-process stand-in with a configurable service delay, which isolates the
+overhead of the client side. Results are printed and can be written as JSON:
+
+    python cosim_latency.py --output latency.json
+    python cosim_latency.py --local --service-delay 0.03 --jitter 0.005 --rounds 1000 --output latency_local.json
+
+With `--windows`, the benchmark is repeated with up to that many rounds in flight (see `PipelinedLink`), which is valid
+here because the consumed field is from the previous round, to compare throughput as a function of the window:
+
+    python cosim_latency.py --local --round-time 0.002 --windows 1 2 4 8 16
+
+With `--agents`, the benchmark is repeated on that many agents, which all run their rounds concurrently on one event
+loop, to compare the latency and throughput of each agent and of all of them together as the number of agents grows.
+The live benchmark adds copies of the SuperDove Base agent to the scenario as needed. Against the stand-in, this
+measures the limits of the client itself, such as the processor time spent serializing values and the lag of a
+saturated event loop:
+
+    python cosim_latency.py --local --service-delay 0.03 --agents 1 4 16 64 256 --rounds 200
+
+With `--trace`, the time of each call is also split into serialization, transport, and waiting on the simulation (see
+`common/instrument.py`), and a trace file of each run is written to the given directory.
+'''
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from collections import deque
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))  # for the helpers shared between notebooks
+from common.bootstrap import client, setting  # noqa: E402
+from common.channel import Channel, PipelinedLink, local_async_channel  # noqa: E402
+from common.instrument import Instrumentation, format_summary  # noqa: E402
+
+BASE_AGENT = 'SuperDove Base'
+LOCAL_AGENT_ID = 'local-agent'
+LOCAL_STATE_ID = 'local-state'
+ATTITUDE = np.array([1.0, 0.0, 0.0, 0.0])
+
+
+def create_state_block(scenario, agent_ids: list[str]):
+    '''
+    Replace the external state blocks of the scenario with the per-round block used by the benchmark on the given
+    agents
+    '''
+    scenario.delete_all_external_state_blocks()
+    return scenario.PerRoundExternalState.create(
+        engine='gnc',
+        agents=agent_ids,
+        consumed='(prev!(root!.estimatedMagneticFieldVector),)',
+        produced='(root!.attitude as Quaternion.body_eci,)'
+    )
+
+
+def benchmark_agents(scenario, n_agents: int) -> list[str]:
+    '''
+    IDs of the SuperDove Base agent and of n_agents - 1 copies of it, which are named "SuperDove Base 2" and so on. The
+    copies are created as needed and reused by later runs.
+    '''
+    agents = {agent.name: agent for agent in scenario.TemplatedAgent.get_all()}
+    base = agents[BASE_AGENT]
+    agent_ids = [base.id]
+    for k in range(2, n_agents + 1):
+        name = f'{BASE_AGENT} {k}'
+        agent = agents[name] if name in agents else base.clone().update(name=name)
+        agent_ids.append(agent.id)
+    return agent_ids
+
+
+async def _round_trips(
+    channel: Channel,
+    agent_id: str,
+    external_state_id: str,
+    values: tuple,
+    n_rounds: int | None,
+    window: int,
+    times: list[float],
+):
+    '''
+    Helper function to time the rounds of one agent into times until an exception is raised or n_rounds are done
+    '''
+    link = PipelinedLink(channel, agent_id, external_state_id, window)
+    starts = deque()
+    while n_rounds is None or len(times) + len(starts) < n_rounds:
+        starts.append(time.perf_counter())
+        if await link.round(values) is not None:
+            times.append(time.perf_counter() - starts.popleft())
+    while starts:
+        await link.oldest()
+        times.append(time.perf_counter() - starts.popleft())
+
+
+async def _loop_lag(lags: list[float], interval: float = 0.001):
+    '''
+    Helper function to record how late the event loop wakes up from short sleeps, which grows when it is saturated
+    '''
+    while True:
+        t = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - t - interval)
+
+
+async def measure_round_trips(
+    channel: Channel,
+    agent_id: str,
+    external_state_id: str,
+    values: tuple = (ATTITUDE,),
+    n_rounds: int | None = None,
+    window: int = 1,
+) -> tuple[list[float], float]:
+    '''
+    Produce and consume every round, with up to window rounds in flight (see `PipelinedLink`), until the simulation
+    terminates or n_rounds are done. Returns the time from the start of each round until its consumed values arrived
+    and the total elapsed time, in seconds.
+    '''
+    times, elapsed, _ = await measure_fan_out(channel, [agent_id], external_state_id, values, n_rounds, window)
+    return times[agent_id], elapsed
+
+
+async def measure_fan_out(
+    channel: Channel,
+    agent_ids: list[str],
+    external_state_id: str,
+    values: tuple = (ATTITUDE,),
+    n_rounds: int | None = None,
+    window: int = 1,
+) -> tuple[dict[str, list[float]], float, list[float]]:
+    '''
+    Run the rounds of every agent concurrently on one event loop, as in `measure_round_trips`. Returns the round times
+    of each agent, the total elapsed time, and the event loop lag sampled every millisecond, in seconds.
+    '''
+    times = {agent_id: [] for agent_id in agent_ids}
+    lags = []
+    monitor = asyncio.create_task(_loop_lag(lags))
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(_round_trips(channel, agent_id, external_state_id, values, n_rounds, window, times[agent_id])
+          for agent_id in agent_ids),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - start
+    monitor.cancel()
+    # The channel of a terminated simulation raises ConnectionError, which is how rounds without a limit end
+    errors = [result for result in results
+              if isinstance(result, BaseException) and not isinstance(result, ConnectionError)]
+    if errors:
+        print('An unexpected exception was raised. Original exception:', errors[0])
+    return times, elapsed, lags
+
+
+def latency_statistics(times: list[float], elapsed: float) -> dict[str, float]:
+    '''
+    Summarize round trip times in milliseconds. Throughput is in rounds per second, and jitter is the mean absolute
+    difference between consecutive round trips.
+    '''
+    ms = np.asarray(times) * 1000
+    if not len(ms):
+        return {'samples': 0}
+    return {
+        'samples': len(ms),
+        'mean_ms': float(np.mean(ms)),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p90_ms': float(np.percentile(ms, 90)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'max_ms': float(np.max(ms)),
+        'std_ms': float(np.std(ms)),
+        'jitter_ms': float(np.mean(np.abs(np.diff(ms)))) if len(ms) > 1 else 0.,
+        'throughput_hz': len(ms) / elapsed if elapsed > 0 else float('nan'),
+    }
+
+
+def fan_out_statistics(times: dict[str, list[float]], elapsed: float, lags: list[float]) -> dict[str, Any]:
+    '''
+    Summarize the round times of every agent together and of each agent, and the event loop lag in milliseconds
+    '''
+    lag_ms = np.asarray(lags) * 1000
+    return {
+        'aggregate': latency_statistics([t for agent_times in times.values() for t in agent_times], elapsed),
+        'agents': {agent_id: latency_statistics(agent_times, elapsed) for agent_id, agent_times in times.items()},
+        'loop_lag_p50_ms': float(np.percentile(lag_ms, 50)) if len(lag_ms) else float('nan'),
+        'loop_lag_p99_ms': float(np.percentile(lag_ms, 99)) if len(lag_ms) else float('nan'),
+    }
+
+
+def _run_entry(
+    window: int,
+    times: dict[str, list[float]],
+    elapsed: float,
+    lags: list[float],
+    instrumentation: Instrumentation | None = None,
+    trace_dir: str | None = None,
+) -> dict[str, Any]:
+    '''
+    Helper function to summarize the benchmark of one window size and number of agents, with the timings of each
+    phase of the calls and their trace file if instrumented
+    '''
+    entry = {
+        'window': window,
+        'n_agents': len(times),
+        'statistics': fan_out_statistics(times, elapsed, lags),
+        'times_ms': {agent_id: [t * 1000 for t in agent_times] for agent_id, agent_times in times.items()},
+    }
+    if instrumentation is not None:
+        Path(trace_dir).mkdir(parents=True, exist_ok=True)
+        entry['phases'] = instrumentation.summary()
+        entry['trace'] = str(Path(trace_dir) / f'trace-agents-{len(times)}-window-{window}.json')
+        instrumentation.write_trace(entry['trace'])
+    return entry
+
+
+async def run_local(
+    service_delay: float,
+    jitter: float,
+    n_rounds: int,
+    seed: int | None = None,
+    windows: Sequence[int] = (1,),
+    round_time: float = 0.,
+    agent_counts: Sequence[int] = (1,),
+    trace_dir: str | None = None,
+) -> dict[str, Any]:
+    '''
+    Run the benchmark against the in-process stand-in channel, on a new stand-in simulation for each number of agents
+    and window size. With trace_dir, the calls are instrumented and a trace of each run is written there.
+    '''
+    runs = []
+    for n_agents in agent_counts:
+        agent_ids = [f'{LOCAL_AGENT_ID}-{k}' for k in range(n_agents)]
+        for window in windows:
+            instrumentation = Instrumentation(labels={LOCAL_STATE_ID: 'benchmark'}) if trace_dir else None
+            async with local_async_channel(
+                service_delay=service_delay, jitter=jitter, n_rounds=n_rounds, seed=seed, round_time=round_time
+            ) as channel:
+                if instrumentation is not None:
+                    channel = instrumentation.channel(channel)
+                times, elapsed, lags = await measure_fan_out(
+                    channel, agent_ids, LOCAL_STATE_ID, n_rounds=n_rounds, window=window
+                )
+            runs.append(_run_entry(window, times, elapsed, lags, instrumentation, trace_dir))
+    return {
+        'channel': 'local',
+        'service_delay_ms': service_delay * 1000,
+        'jitter_ms': jitter * 1000,
+        'round_time_ms': round_time * 1000,
+        'runs': runs,
+    }
+
+
+def _live_settings(scenario_branch_id: str, host: str) -> tuple[str, str]:
+    '''
+    Helper function to resolve the host and scenario branch ID from the arguments and config.json
+    '''
+    scenario_branch_id = scenario_branch_id or setting('BENCHMARKING', 'LATENCY', 'SCENARIO_BRANCH_ID', default='')
+    host = host or setting('HOST', default='')
+    assert scenario_branch_id, "SCENARIO_BRANCH_ID must be set if not present in config.json"
+    assert host, "HOST must be set if not present in config.json"
+    return host, scenario_branch_id
+
+
+async def run_live(
+    scenario_branch_id: str = '',
+    host: str = '',
+    n_rounds: int | None = None,
+    windows: Sequence[int] = (1,),
+    agent_counts: Sequence[int] = (1,),
+    trace_dir: str | None = None,
+) -> dict[str, Any]:
+    '''
+    Run the benchmark on the SuperDove scenario, on a new simulation for each number of agents and window size. The
+    scenario gets as many copies of the SuperDove Base agent as the largest number of agents needs. With trace_dir,
+    the calls are instrumented and a trace of each run is written there.
+    '''
+    host, scenario_branch_id = _live_settings(scenario_branch_id, host)
+    scenario = client(host).scenario(scenario_branch_id)
+    all_agent_ids = benchmark_agents(scenario, max(agent_counts))
+    runs = []
+    for n_agents in agent_counts:
+        agent_ids = all_agent_ids[:n_agents]
+        state_block = create_state_block(scenario, agent_ids)
+        for window in windows:
+            instrumentation = Instrumentation(labels={state_block.id: 'benchmark'}) if trace_dir else None
+            simulation_handle = scenario.simulation.start(wait=True)
+            async with simulation_handle.async_channel() as channel:
+                if instrumentation is not None:
+                    channel = instrumentation.channel(channel)
+                times, elapsed, lags = await measure_fan_out(
+                    channel, agent_ids, state_block.id, n_rounds=n_rounds, window=window
+                )
+            if n_rounds is not None:
+                simulation_handle.terminate()
+            runs.append(_run_entry(window, times, elapsed, lags, instrumentation, trace_dir))
+    return {'channel': 'sedaro', 'host': host, 'runs': runs}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--local', action='store_true', help='use the in-process stand-in channel')
+    parser.add_argument('--service-delay', type=float, default=0.03, help='round trip delay of the stand-in in seconds')
+    parser.add_argument('--jitter', type=float, default=0., help='extra random delay of the stand-in in seconds')
+    parser.add_argument('--rounds', type=int, help='number of rounds (default: until the simulation terminates)')
+    parser.add_argument('--seed', type=int, help='seed for the jitter of the stand-in')
+    parser.add_argument('--round-time', type=float, default=0., help='time the stand-in takes per round in seconds')
+    parser.add_argument('--windows', type=int, nargs='+', default=[1], help='numbers of rounds in flight to compare')
+    parser.add_argument('--agents', type=int, nargs='+', default=[1], help='numbers of agents to compare')
+    parser.add_argument('--trace', metavar='DIR', help='time the phases of each call and write traces to DIR')
+    parser.add_argument('--scenario-branch-id', default='', help='SuperDove scenario (default: from config.json)')
+    parser.add_argument('--host', default='', help='Sedaro host (default: from config.json)')
+    parser.add_argument('--output', help='path to write the JSON results to')
+    args = parser.parse_args(argv)
+
+    if args.local:
+        results = asyncio.run(run_local(
+            args.service_delay, args.jitter, args.rounds or 1000, args.seed, args.windows, args.round_time, args.agents,
+            args.trace,
+        ))
+    else:
+        results = asyncio.run(run_live(
+            args.scenario_branch_id, args.host, args.rounds, args.windows, args.agents, args.trace
+        ))
+    results['platform'] = platform.platform()
+    results['python'] = platform.python_version()
+
+    columns = ('p50_ms', 'p90_ms', 'p99_ms', 'max_ms', 'jitter_ms', 'throughput_hz', 'agent_min_hz', 'loop_lag_p99_ms')
+    print(f'{"agents":>8}{"window":>8}{"samples":>10}' + ''.join(f'{column:>16}' for column in columns))
+    for run in results['runs']:
+        statistics = run['statistics']
+        row = {
+            **statistics['aggregate'],
+            'agent_min_hz': min(agent.get('throughput_hz', 0.) for agent in statistics['agents'].values()),
+            'loop_lag_p99_ms': statistics['loop_lag_p99_ms'],
+        }
+        print(f'{run["n_agents"]:>8}{run["window"]:>8}{row["samples"]:>10}'
+              + ''.join(f'{row.get(column, float("nan")):>16.3f}' for column in columns))
+    for run in results['runs']:
+        if 'phases' in run:
+            print(f'\n{run["n_agents"]} agents, window {run["window"]} (trace: {run["trace"]})')
+            print(format_summary(run['phases']))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
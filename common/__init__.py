@@ -0,0 +1,3 @@
+'''
+Helpers shared by the notebooks in this repository. Notebooks add the repository root to `sys.path` to import them.
+'''
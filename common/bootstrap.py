@@ -0,0 +1,129 @@
+'''
+Configuration and a shared Sedaro client for the notebooks and scripts in this repository.
+
+`config.json` and `secrets.json` are read from the repository root, wherever the script runs from, once per process.
+The client is made once per host and reused, and so are its HTTP connections, which the client otherwise opens anew
+for every request:
+
+    from common.bootstrap import client, setting
+    sedaro = client()
+    scenario = sedaro.scenario(setting('VALIDATION', 'GRAVITY', 'SCENARIO_BRANCH_ID'))
+
+The API key can also be set with the SEDARO_API_KEY environment variable, and the directory of the two files with
+SEDARO_CONFIG_DIR. This module only imports the Sedaro client when the first client is made, so scripts and worker
+processes that only read the configuration, or never use the API, start without loading it.
+'''
+import json
+import os
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from sedaro import SedaroApiClient
+
+ROOT = Path(__file__).resolve().parents[1]
+_REQUIRED = object()
+
+_clients: dict[str, 'SedaroApiClient'] = {}
+_lock = threading.Lock()
+
+
+def config_directory() -> Path:
+    '''
+    The directory of config.json and secrets.json, which is the repository root unless SEDARO_CONFIG_DIR is set
+    '''
+    return Path(os.environ.get('SEDARO_CONFIG_DIR', ROOT))
+
+
+@lru_cache(maxsize=None)
+def _read(name: str) -> dict:
+    '''
+    Helper function to read a JSON file of the configuration directory the first time it is needed
+    '''
+    with open(config_directory() / name, 'r') as file:
+        return json.load(file)
+
+
+def config() -> dict:
+    '''
+    The contents of config.json
+    '''
+    return _read('config.json')
+
+
+def setting(*keys: str, default: Any = _REQUIRED) -> Any:
+    '''
+    The value of config.json under the given keys, such as setting('EXAMPLES', 'ROUTINES', 'AGENT_TEMPLATE_BRANCH_ID').
+    With a default, it is returned if config.json or the keys are missing instead of raising.
+    '''
+    try:
+        value = config()
+        for key in keys:
+            value = value[key]
+    except (FileNotFoundError, KeyError):
+        if default is _REQUIRED:
+            raise
+        return default
+    return value
+
+
+def api_key() -> str:
+    '''
+    The API key from the SEDARO_API_KEY environment variable, or else from secrets.json
+    '''
+    return os.environ.get('SEDARO_API_KEY') or _read('secrets.json')['API_KEY']
+
+
+@lru_cache(maxsize=None)
+def _client_class() -> type:
+    '''
+    Helper function to define the client class the first time a client is made, so the Sedaro client is only
+    imported then
+    '''
+    from sedaro import SedaroApiClient
+
+    class PooledSedaroApiClient(SedaroApiClient):
+        '''
+        A Sedaro client that sends every request through the same ApiClient, and so through the same pool of HTTP
+        connections, instead of making a new one with a new pool for each request
+        '''
+
+        _pooled_api = None
+
+        @contextmanager
+        def api_client(self):
+            if self._pooled_api is None:
+                # leaving the context only stops the thread pool of asynchronous requests, not the connections
+                with super().api_client() as api:
+                    pass
+                self._pooled_api = api
+            yield self._pooled_api
+
+    return PooledSedaroApiClient
+
+
+def client(host: str | None = None) -> 'SedaroApiClient':
+    '''
+    The shared client for host, which is the HOST of config.json by default, made the first time it is needed in
+    each process
+    '''
+    host = host or setting('HOST')
+    with _lock:
+        if host not in _clients:
+            _clients[host] = _client_class()(api_key=api_key(), host=host)
+        return _clients[host]
+
+
+def _forget_clients():
+    '''
+    Helper function to drop the clients in a forked process, since it can't share their connections with its parent
+    '''
+    global _lock
+    _lock = threading.Lock()
+    _clients.clear()
+
+
+os.register_at_fork(after_in_child=_forget_clients)
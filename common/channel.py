@@ -0,0 +1,374 @@
+'''
+Helpers for exchanging external state with a simulation through a cosimulation channel, such as the one opened by
+`SimulationHandle.async_channel`.
+'''
+import asyncio
+import json
+import random
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterable
+from contextlib import asynccontextmanager
+from copy import deepcopy
+from typing import Any, Protocol
+
+import numpy as np
+
+
+class Channel(Protocol):
+    '''
+    The methods of a cosimulation channel used by the helpers in this package
+    '''
+
+    async def consume(self, external_state_id: str, agent_id: str, timestamp: float | None = None) -> tuple: ...
+
+    async def produce(
+        self,
+        external_state_id: str,
+        agent_id: str,
+        values: tuple,
+        timestamp: float | None = None,
+    ) -> Any: ...
+
+
+class ExternalStateLink:
+    '''
+    One external state block of one agent on a cosimulation channel.
+
+    With cache_produced, values equal to the last values produced are not sent again. Only use it with
+    `SpontaneousExternalState` blocks, which keep their last produced values. A `PerRoundExternalState` block needs
+    its values every round.
+    '''
+
+    def __init__(self, channel: Channel, agent_id: str, external_state_id: str, cache_produced: bool = False):
+        self.channel = channel
+        self.agent_id = agent_id
+        self.external_state_id = external_state_id
+        self.cache_produced = cache_produced
+        self.produced: tuple | None = None
+
+    async def consume(self, timestamp: float | None = None) -> tuple:
+        '''
+        Consume the values of the block, at the given simulation time (MJD) for a spontaneous block
+        '''
+        return await self.channel.consume(
+            agent_id=self.agent_id, external_state_id=self.external_state_id, timestamp=timestamp
+        )
+
+    async def produce(self, values: tuple, timestamp: float | None = None) -> bool:
+        '''
+        Produce values to the block. Returns whether they were sent, which they aren't if they are cached.
+        '''
+        if self.cache_produced and self.produced is not None and values == self.produced:
+            return False
+        await self.channel.produce(
+            agent_id=self.agent_id, external_state_id=self.external_state_id, values=values, timestamp=timestamp
+        )
+        if self.cache_produced:
+            self.produced = deepcopy(values)
+        return True
+
+
+class PipelinedLink(ExternalStateLink):
+    '''
+    One external state block of one agent, exchanged in rounds of one produce and one consume with up to window rounds
+    in flight.
+
+    Rounds overlap as follows: the requests of round r are issued once those of round r - 1 were issued, so they reach
+    the channel in round order, and the consumed values of each round are returned in round order. Round r is started
+    while rounds r - window + 1 to r - 1 are still in flight, so the values produced in round r can only depend on
+    values consumed up to round r - window. A window of 1 is the lockstep loop, where each round completes before the
+    next one starts.
+
+    Only use a window above 1 with blocks whose consumed fields do not depend on the values produced in the same round,
+    such as `prev!(...)` fields, and whose simulation buffers values produced for rounds it has not reached yet.
+    '''
+
+    def __init__(self, channel: Channel, agent_id: str, external_state_id: str, window: int = 1):
+        if window < 1:
+            raise ValueError(f'The window must be at least 1, not {window}')
+        super().__init__(channel, agent_id, external_state_id)
+        self.window = window
+        self.in_flight: deque[asyncio.Task] = deque()
+
+    async def _round(self, values: tuple, timestamp: float | None) -> tuple:
+        _, consumed = await asyncio.gather(self.produce(values, timestamp), self.consume(timestamp))
+        return consumed
+
+    async def round(self, values: tuple, timestamp: float | None = None) -> tuple | None:
+        '''
+        Start a round producing values. Returns the consumed values of the oldest round in flight once the window is
+        full, which frees a slot for the next round, and None while the window is filling up.
+        '''
+        self.in_flight.append(asyncio.create_task(self._round(values, timestamp)))
+        if len(self.in_flight) < self.window:
+            return None
+        return await self.oldest()
+
+    async def oldest(self) -> tuple:
+        '''
+        Wait for the oldest round in flight and return its consumed values. If it failed, the other rounds in flight
+        are cancelled and the exception is raised.
+        '''
+        task = self.in_flight.popleft()
+        try:
+            return await task
+        except BaseException:
+            await self.cancel()
+            raise
+
+    async def drain(self) -> list[tuple]:
+        '''
+        Wait for every round in flight and return their consumed values in round order
+        '''
+        return [await self.oldest() for _ in range(len(self.in_flight))]
+
+    async def cancel(self):
+        '''
+        Cancel every round in flight
+        '''
+        for task in self.in_flight:
+            task.cancel()
+        await asyncio.gather(*self.in_flight, return_exceptions=True)
+        self.in_flight.clear()
+
+
+class LatestValue:
+    '''
+    A slot holding the most recently set value for a task on an event loop to take. Values can be set from any thread,
+    such as a keyboard listener's, and a value set before the previous one was taken replaces it, so a slow consumer
+    only ever sees the latest value.
+    '''
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._value = None
+        self._event = asyncio.Event()
+
+    def set(self, value: Any):
+        '''
+        Set the value, from any thread
+        '''
+        self._loop.call_soon_threadsafe(self._set, value)
+
+    def _set(self, value: Any):
+        self._value = value
+        self._event.set()
+
+    async def get(self) -> Any:
+        '''
+        Wait for a value that was set since the last one was taken, and take it
+        '''
+        await self._event.wait()
+        self._event.clear()
+        return self._value
+
+
+class LocalChannel:
+    '''
+    In-process stand-in for the channel of `SimulationHandle.async_channel`, for developing and benchmarking
+    cosimulators without a running simulation.
+
+    Each external state block of each agent behaves like a `PerRoundExternalState`, and all of them advance together:
+    the simulation only starts a round once the values of the previous round were produced to every block, so the
+    consume of a round waits for those produces. Blocks in spontaneous_ids behave like a `SpontaneousExternalState` and
+    never wait. The simulation only knows about blocks that were sent a request.
+
+    Requests take service_delay seconds, split between the way to the simulation and back, plus up to jitter seconds of
+    uniformly distributed extra delay on each way. Requests of one kind for one block reach the simulation in the order
+    they were sent, but replies can overtake each other. Values are serialized like the Sedaro client serializes them,
+    so the stand-in costs the client as much processor time as a real channel. With round_time, the simulation also
+    takes that many seconds for each block in each round, one block at a time, which caps the rate of rounds however
+    many are in flight.
+
+    Consumed values come from values(agent_id, external_state_id, round), or echo the last produced values by default.
+    The simulation terminates once every block consumed, and every per-round block produced, the values of n_rounds
+    rounds. After that every request, including those waiting for later rounds, raises ConnectionError like the channel
+    of a terminated simulation.
+    '''
+
+    def __init__(
+        self,
+        service_delay: float = 0.03,
+        jitter: float = 0.,
+        n_rounds: int | None = None,
+        values: Callable[[str, str, int], tuple] | None = None,
+        spontaneous_ids: Iterable[str] = (),
+        seed: int | None = None,
+        round_time: float = 0.,
+    ):
+        self.service_delay = service_delay
+        self.jitter = jitter
+        self.n_rounds = n_rounds
+        self.values = values
+        self.spontaneous_ids = set(spontaneous_ids)
+        self.random = random.Random(seed)
+        self.round_time = round_time
+        self.round = 0
+        self.consumed: dict[tuple[str, str], int] = {}
+        self.produced: dict[tuple[str, str], int] = {}
+        self.last_produced: dict[tuple[str, str], str] = {}
+        self.terminated = False
+        self._blocks: set[tuple[str, str]] = set()
+        self._finished: set[tuple[str, str]] = set()
+        self._completed: dict[tuple[str, str], int] = {}
+        self._arrivals: dict[tuple[str, str, str], asyncio.Future] = {}
+        self._busy_until = 0.
+        self._round_done = asyncio.Condition()
+
+    def _register(self, external_state_id: str, agent_id: str) -> tuple[str, str]:
+        key = (agent_id, external_state_id)
+        if key not in self._blocks:
+            self._blocks.add(key)
+            if external_state_id not in self.spontaneous_ids:
+                self.round = min(self.round, self.produced.get(key, 0))
+        return key
+
+    async def _send(self, kind: str, key: tuple[str, str]):
+        '''
+        Helper function to wait for a request to reach the simulation. Requests of the same kind for the same block
+        arrive in the order they were sent, like over one connection.
+        '''
+        previous = self._arrivals.get((kind, *key))
+        arrived = self._arrivals[(kind, *key)] = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.sleep(self.service_delay / 2 + self.random.uniform(0, self.jitter))
+            if previous is not None:
+                await asyncio.shield(previous)
+        finally:
+            if not arrived.done():
+                arrived.set_result(None)
+        self._check_running()
+
+    async def _reply(self):
+        await asyncio.sleep(self.service_delay / 2 + self.random.uniform(0, self.jitter))
+
+    def _check_running(self):
+        if self.terminated:
+            raise ConnectionError('Simulation RPC failed: the simulation has terminated')
+
+    async def consume(self, external_state_id: str, agent_id: str, timestamp: float | None = None) -> tuple:
+        key = self._register(external_state_id, agent_id)
+        return decode_values(await self._send_simulation_action('consume', key))
+
+    async def produce(
+        self,
+        external_state_id: str,
+        agent_id: str,
+        values: tuple,
+        timestamp: float | None = None,
+    ) -> int:
+        key = self._register(external_state_id, agent_id)
+        return await self._send_simulation_action('produce', key, encode_values(values))
+
+    async def _send_simulation_action(self, kind: str, key: tuple[str, str], payload: str | None = None) -> str | int:
+        '''
+        Helper function for the round trip of a serialized request, which returns the payload of a consume or the index
+        of a produce like the method of the same name of the Sedaro client
+        '''
+        await self._send(kind, key)
+        if kind == 'consume':
+            result = await self._serve_consume(key)
+        else:
+            result = await self._serve_produce(key, payload)
+        await self._check_done(key)
+        await self._reply()
+        return result
+
+    async def _serve_consume(self, key: tuple[str, str]) -> str:
+        agent_id, external_state_id = key
+        round_ = self.consumed.get(key, 0)
+        if self.n_rounds is not None and round_ >= self.n_rounds:
+            await self._wait_for_termination()
+        self.consumed[key] = round_ + 1
+        if external_state_id not in self.spontaneous_ids:
+            async with self._round_done:
+                await self._round_done.wait_for(lambda: self.terminated or self.round >= round_)
+            self._check_running()
+            if self.round_time:
+                now = asyncio.get_running_loop().time()
+                self._busy_until = max(now, self._busy_until) + self.round_time
+                await asyncio.sleep(self._busy_until - now)
+                self._check_running()
+        self._completed[key] = self._completed.get(key, 0) + 1
+        if self.values is not None:
+            return encode_values(self.values(agent_id, external_state_id, round_))
+        return self.last_produced.get(key, encode_values(()))
+
+    async def _serve_produce(self, key: tuple[str, str], payload: str) -> int:
+        previous = self.produced.get(key, 0)
+        if self.n_rounds is not None and previous >= self.n_rounds:
+            await self._wait_for_termination()
+        self.produced[key] = index = previous + 1
+        self.last_produced[key] = payload
+        if key[1] not in self.spontaneous_ids and previous == self.round:
+            self.round = min(
+                (self.produced.get(block, 0) for block in self._blocks if block[1] not in self.spontaneous_ids),
+                default=index,
+            )
+            async with self._round_done:
+                self._round_done.notify_all()
+        return index
+
+    async def _check_done(self, key: tuple[str, str]):
+        '''
+        Helper function to terminate the simulation once every block consumed and produced the values of every round
+        '''
+        n_rounds = self.n_rounds
+        if n_rounds is None or self._completed.get(key, 0) < n_rounds:
+            return
+        if key[1] in self.spontaneous_ids or self.produced.get(key, 0) >= n_rounds:
+            self._finished.add(key)
+        if len(self._finished) == len(self._blocks):
+            await self._terminate()
+
+    async def _wait_for_termination(self):
+        '''
+        Helper function for requests beyond the last round, which wait until the simulation terminates and then fail
+        '''
+        async with self._round_done:
+            await self._round_done.wait_for(lambda: self.terminated)
+        self._check_running()
+
+    async def _terminate(self):
+        self.terminated = True
+        async with self._round_done:
+            self._round_done.notify_all()
+
+
+def _serdes(value):
+    '''
+    Helper function to convert values to and from their JSON form on a Sedaro cosimulation channel, where arrays are
+    objects with an "ndarray" list
+    '''
+    if type(value) is dict and 'ndarray' in value:
+        return np.array(value['ndarray'])
+    if type(value) is np.ndarray:
+        return {'ndarray': value.tolist()}
+    if type(value) is dict:
+        return {k: _serdes(v) for k, v in value.items()}
+    if type(value) in {list, tuple}:
+        return [_serdes(v) for v in value]
+    return value
+
+
+def encode_values(values: tuple) -> str:
+    '''
+    Serialize values the way the Sedaro client sends them
+    '''
+    return json.dumps({'payload': _serdes(values)})
+
+
+def decode_values(payload: str) -> tuple:
+    '''
+    Deserialize values the way the Sedaro client receives them
+    '''
+    return tuple(_serdes(v) for v in json.loads(payload)['payload'])
+
+
+@asynccontextmanager
+async def local_async_channel(**kwargs) -> AsyncIterator[LocalChannel]:
+    '''
+    Open a `LocalChannel` the way `SimulationHandle.async_channel` opens a channel, with the keyword arguments of
+    `LocalChannel`
+    '''
+    yield LocalChannel(**kwargs)
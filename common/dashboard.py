@@ -0,0 +1,218 @@
+'''
+A text dashboard for the status of interactive cosimulations, which only redraws what changed.
+
+The layout is a template of static text and `{name:spec}` fields, parsed once. Each field is a slot of fixed width on
+the screen: numeric fields are formatted with their spec, whose width is required, and other fields are drawn by a
+`Slot` such as a `Bar`. In a terminal, the first frame draws the whole dashboard and later frames only move the cursor
+to the slots whose text changed and overwrite them. Jupyter output does not support moving the cursor, so there each
+frame that changed anything redraws the whole dashboard, which is cheap since only the slots are formatted.
+
+    dashboard = Dashboard(
+        'Altitude: {altitude:8.2f} km\\n'
+        'Charge:   {charge_bar} {charge:7.2%}',
+        slots={'charge_bar': Bar(0, 1, width=41)},
+    )
+    dashboard.render({'altitude': 512.3, 'charge_bar': 0.8, 'charge': 0.8})
+
+How often to render is up to the caller, such as the render task of `CosimRuntime`.
+'''
+import math
+import re
+import sys
+from collections.abc import Callable
+from string import Formatter
+from typing import Any, TextIO
+
+_ANSI = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+RESET = '\033[0m'
+
+
+def visible_width(text: str) -> int:
+    '''
+    The number of characters text takes up on the screen, not counting ANSI escape sequences
+    '''
+    return len(_ANSI.sub('', text))
+
+
+class Slot:
+    '''
+    A field of width characters drawn by format(value), which may include ANSI colors. Text is padded or cut to fit.
+    '''
+
+    def __init__(self, width: int, format: Callable[[Any], str] = str):
+        self.width = width
+        self.format = format
+
+    def __call__(self, value: Any) -> str:
+        text = self.format(value)
+        width = visible_width(text)
+        if width > self.width:
+            return _ANSI.sub('', text)[:self.width]
+        return text + ' ' * (self.width - width)
+
+
+class Bar(Slot):
+    '''
+    A bar of width characters, brackets included, filled from start to value on a scale from minimum to maximum. The
+    bars for each position are built once and reused.
+    '''
+
+    def __init__(
+        self,
+        minimum: float,
+        maximum: float,
+        start: float = 0,
+        width: int = 101,
+        bar_color: str = '\033[34m',  # blue
+        slide_color: str = '\033[36m',  # cyan
+        rail_color: str = RESET,
+    ):
+        super().__init__(width, self._draw)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.colors = {'█': bar_color, '-': slide_color, '|': rail_color}
+        self.rail_color = rail_color
+        self._start = self._index(start)
+        self._bars: dict[int, str] = {}
+
+    def _index(self, value: float) -> int:
+        '''
+        Helper function to get the position of a value on the bar, between its brackets
+        '''
+        w = self.width - 2
+        if math.isnan(value):
+            value = self.minimum
+        value = max(self.minimum, min(value, self.maximum))
+        return min(int((value - self.minimum) / (self.maximum - self.minimum) * w), w - 1)
+
+    def _draw(self, value: float) -> str:
+        index = self._index(value)
+        bar = self._bars.get(index)
+        if bar is None:
+            low, high = sorted((self._start, index))
+            chars = ['-'] * (self.width - 2)
+            chars[low:high + 1] = ['█'] * (high + 1 - low)
+            chars[self._start] = '|'
+            # color each run of equal characters once
+            runs, previous = [], None
+            for char in chars:
+                if char != previous:
+                    runs.append(self.colors[char])
+                    previous = char
+                runs.append(char)
+            bar = self._bars[index] = self.rail_color + '[' + ''.join(runs) + self.rail_color + ']'
+        return bar
+
+    def __call__(self, value: float) -> str:
+        return self._draw(value)
+
+
+class _Field:
+    '''
+    Helper class with the position of a field on the screen and how to draw it
+    '''
+
+    def __init__(self, name: str, row: int, column: int, slot: Slot):
+        self.name = name
+        self.row = row
+        self.column = column
+        self.slot = slot
+
+
+def _spec_slot(name: str, spec: str) -> Slot:
+    '''
+    Helper function to make the slot of a field formatted with a format spec, filled with # if the value doesn't fit
+    '''
+    match = re.match(r'^(?:.?[<>=^])?[+\- ]?z?#?0?(\d+)', spec)
+    if match is None:
+        raise ValueError(f'The format spec of field {name} needs a width, not {spec!r}')
+    width = int(match.group(1))
+
+    def draw(value: Any) -> str:
+        text = format(value, spec)
+        return text if len(text) <= width else '#' * width
+
+    return Slot(width, draw)
+
+
+class Dashboard:
+    '''
+    A dashboard drawn from a template of static text and fields (see the module docstring), with slots for the fields
+    that are not formatted with a format spec. Static text should reset any ANSI attributes it sets before the next
+    field, since fields are drawn on their own.
+
+    In a terminal, the dashboard is drawn at the top of a cleared screen. With redraw, or by default in Jupyter, every
+    frame that changed anything is drawn in full instead.
+    '''
+
+    def __init__(
+        self,
+        template: str,
+        slots: dict[str, Slot] | None = None,
+        redraw: bool | None = None,
+        stream: TextIO | None = None,
+    ):
+        slots = slots or {}
+        self.redraw = 'ipykernel' in sys.modules if redraw is None else redraw
+        self.stream = stream
+        self.fields: dict[str, _Field] = {}
+        self._lines: list[list[str | _Field]] = []
+        for row, line in enumerate(template.split('\n')):
+            if '\t' in line:
+                raise ValueError('Align the template with spaces, since tabs have no fixed width')
+            parts, column = [], 0
+            for literal, name, spec, _ in Formatter().parse(line):
+                if literal:
+                    parts.append(literal)
+                    column += visible_width(literal)
+                if name is None:
+                    continue
+                if name in self.fields:
+                    raise ValueError(f'Field {name} appears more than once in the template')
+                slot = slots[name] if name in slots else _spec_slot(name, spec)
+                field = self.fields[name] = _Field(name, row, column, slot)
+                parts.append(field)
+                column += slot.width
+            self._lines.append(parts)
+        self.cells = {name: ' ' * field.slot.width for name, field in self.fields.items()}
+        self._drawn = False
+
+    def reset(self):
+        '''
+        Draw the whole dashboard on the next frame, such as after other output
+        '''
+        self._drawn = False
+
+    def frame(self) -> str:
+        '''
+        The whole dashboard with the current text of each field
+        '''
+        return '\n'.join(
+            ''.join(part if isinstance(part, str) else self.cells[part.name] + RESET for part in parts)
+            for parts in self._lines
+        )
+
+    def render(self, values: dict[str, Any]) -> int:
+        '''
+        Draw the given values of fields, keeping the others as they were, and return how many fields changed
+        '''
+        changed = []
+        for name, value in values.items():
+            text = self.fields[name].slot(value)
+            if text != self.cells[name]:
+                self.cells[name] = text
+                changed.append(self.fields[name])
+        stream = self.stream or sys.stdout
+        if self.redraw:
+            if changed or not self._drawn:
+                from IPython.display import clear_output
+                clear_output(wait=True)
+                stream.write(self.frame() + '\n')
+        elif not self._drawn:
+            stream.write('\x1b[2J\x1b[H' + self.frame() + '\n')
+        elif changed:
+            stream.write(''.join(f'\x1b[{field.row + 1};{field.column + 1}H{self.cells[field.name]}{RESET}'
+                                 for field in changed) + f'\x1b[{len(self._lines) + 1};1H')
+        stream.flush()
+        self._drawn = True
+        return len(changed)
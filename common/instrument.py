@@ -0,0 +1,352 @@
+'''
+Opt-in timing of the consume and produce calls of a cosimulation. Wrapping a channel from
+`SimulationHandle.async_channel` (or a `LocalChannel`) or a synchronous `SimulationHandle` times each call in phases:
+
+- `encode`: serializing the produced values before the request is sent
+- `transport`: the round trip of the request itself, estimated as the fastest round trip seen so far for the same
+  operation on the same block
+- `wait`: the rest of the round trip, which is time spent waiting on the simulation (or queued behind other requests)
+- `decode`: deserializing the response
+- `total`: the whole call
+
+Timestamps come from `time.perf_counter_ns` and are aggregated into fixed-bucket histograms as calls complete, so the
+overhead is a few clock reads and counter increments per call. The split between serialization and the round trip
+relies on internals of the Sedaro client; with a client that lacks them, the whole call counts as the round trip. With
+the synchronous handle, encoding produced values is part of the round trip.
+
+    instrumentation = Instrumentation(labels={gnc_block.id: 'GNC'})
+    simulation_handle = instrumentation.handle(simulation_handle)
+    ...
+    print(instrumentation.summary_table())
+    instrumentation.write_trace('cosim_trace.json')  # open in chrome://tracing or https://ui.perfetto.dev
+'''
+import json
+from bisect import bisect_right
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from inspect import getattr_static
+from time import perf_counter_ns
+from typing import Any
+
+PHASES = ('encode', 'transport', 'wait', 'decode', 'total')
+
+
+class Histogram:
+    '''
+    Counts of durations in nanoseconds in fixed buckets spaced logarithmically from 1 us to 100 s, 16 per decade, so
+    quantiles are accurate to within 16%
+    '''
+    BOUNDS_NS = [round(1e3 * 10**(k / 16)) for k in range(8 * 16 + 1)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_NS) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def add(self, ns: int):
+        self.counts[bisect_right(self.BOUNDS_NS, ns)] += 1
+        self.count += 1
+        self.total += ns
+        if self.min is None or ns < self.min:
+            self.min = ns
+        if self.max is None or ns > self.max:
+            self.max = ns
+
+    def quantile(self, q: float) -> float:
+        '''
+        The upper bound of the bucket holding the q quantile, clamped to the observed range, in nanoseconds
+        '''
+        if not self.count:
+            return float('nan')
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank and count:
+                bound = self.BOUNDS_NS[index] if index < len(self.BOUNDS_NS) else self.max
+                return float(min(max(bound, self.min), self.max))
+        return float(self.max)
+
+
+class _Call:
+    '''A consume or produce call in progress'''
+    __slots__ = ('operation', 'block', 'agent_id', 'start', 'rpc_start', 'rpc_end')
+
+    def __init__(self, operation: str, block: str, agent_id: str):
+        self.operation = operation
+        self.block = block
+        self.agent_id = agent_id
+        self.rpc_start = None
+        self.rpc_end = None
+        self.start = perf_counter_ns()
+
+
+# The call being timed in the current thread or asyncio task, which the hooks in the clients mark the round trip of
+_current: ContextVar[_Call | None] = ContextVar('_current', default=None)
+
+
+def _hook_async_rpc(channel):
+    '''
+    Helper function to time the round trips of an async channel, which go through `_send_simulation_action`. Wrappers
+    that forward attributes to the channel they wrap, such as a `RecordingChannel`, are unwrapped down to the channel
+    with the method, so it is replaced where it is called from.
+    '''
+    while getattr_static(channel, '_send_simulation_action', None) is None:
+        inner = getattr_static(channel, 'channel', None)
+        if inner is None:
+            break
+        channel = inner
+    original = getattr(channel, '_send_simulation_action', None)
+    if original is None or getattr(original, 'instrumented', False):
+        return
+
+    async def timed(*args, **kwargs):
+        call = _current.get()
+        if call is None:
+            return await original(*args, **kwargs)
+        call.rpc_start = perf_counter_ns()
+        try:
+            return await original(*args, **kwargs)
+        finally:
+            call.rpc_end = perf_counter_ns()
+
+    timed.instrumented = True
+    channel._send_simulation_action = timed
+
+
+def _hook_sync_rpc(handle):
+    '''
+    Helper function to time the round trips of a synchronous simulation handle, which are the requests made with the
+    client from `externals_client`
+    '''
+    sim_client = getattr(handle, '_sim_client', None)
+    original = getattr(sim_client, 'externals_client', None)
+    if original is None or getattr(original, 'instrumented', False):
+        return
+
+    @contextmanager
+    def timed(*args, **kwargs):
+        call = _current.get()
+        if call is not None:
+            call.rpc_start = perf_counter_ns()
+        try:
+            with original(*args, **kwargs) as client:
+                yield client
+        finally:
+            if call is not None:
+                call.rpc_end = perf_counter_ns()
+
+    timed.instrumented = True
+    sim_client.externals_client = timed
+
+
+class Instrumentation:
+    '''
+    Collects the phase timings of the consume and produce calls on the channels and handles it wraps.
+
+    Args:
+        labels: Names to report external state blocks by, by external state block ID. Blocks without a label are
+            reported by ID.
+        trace: Whether to keep the timestamps of each call for `write_trace`
+        max_trace_calls: The number of calls to keep the timestamps of, after which only the histograms are updated
+    '''
+
+    def __init__(self, labels: dict[str, str] | None = None, trace: bool = True, max_trace_calls: int = 100_000):
+        self.labels = labels or {}
+        self.trace = trace
+        self.max_trace_calls = max_trace_calls
+        self.histograms: dict[tuple[str, str, str], Histogram] = defaultdict(Histogram)
+        self.floors: dict[tuple[str, str], int] = {}
+        self.calls: list[tuple] = []
+
+    def channel(self, channel) -> 'InstrumentedChannel':
+        '''
+        Wrap an async cosimulation channel
+        '''
+        return InstrumentedChannel(channel, self)
+
+    def handle(self, handle) -> 'InstrumentedHandle':
+        '''
+        Wrap a synchronous simulation handle
+        '''
+        return InstrumentedHandle(handle, self)
+
+    def _begin(self, operation: str, agent_id: str, external_state_id: str) -> _Call:
+        return _Call(operation, self.labels.get(external_state_id, external_state_id), agent_id)
+
+    def _end(self, call: _Call):
+        end = perf_counter_ns()
+        rpc_start = call.start if call.rpc_start is None else call.rpc_start
+        rpc_end = end if call.rpc_end is None else call.rpc_end
+        rpc = rpc_end - rpc_start
+        key = (call.operation, call.block)
+        floor = self.floors[key] = min(self.floors.get(key, rpc), rpc)
+        histograms = self.histograms
+        histograms[(*key, 'encode')].add(rpc_start - call.start)
+        histograms[(*key, 'transport')].add(floor)
+        histograms[(*key, 'wait')].add(rpc - floor)
+        histograms[(*key, 'decode')].add(end - rpc_end)
+        histograms[(*key, 'total')].add(end - call.start)
+        if self.trace and len(self.calls) < self.max_trace_calls:
+            self.calls.append((call.operation, call.block, call.agent_id, call.start, rpc_start, rpc_end, end, floor))
+
+    def summary(self) -> list[dict[str, Any]]:
+        '''
+        Count, mean, and quantiles in milliseconds of each phase of each operation on each block
+        '''
+        rows = []
+        for (operation, block, phase), histogram in sorted(
+            self.histograms.items(), key=lambda item: (item[0][0], item[0][1], PHASES.index(item[0][2]))
+        ):
+            rows.append({
+                'operation': operation,
+                'block': block,
+                'phase': phase,
+                'count': histogram.count,
+                'mean_ms': histogram.total / histogram.count / 1e6 if histogram.count else float('nan'),
+                'p50_ms': histogram.quantile(0.5) / 1e6,
+                'p90_ms': histogram.quantile(0.9) / 1e6,
+                'p99_ms': histogram.quantile(0.99) / 1e6,
+                'max_ms': histogram.max / 1e6 if histogram.count else float('nan'),
+            })
+        return rows
+
+    def summary_table(self) -> str:
+        '''
+        The summary as a fixed-width text table
+        '''
+        return format_summary(self.summary())
+
+    def trace_events(self) -> list[dict[str, Any]]:
+        '''
+        The kept calls as nested async events of the Trace Event Format, with timestamps in microseconds since the
+        first call. The round trip is drawn as half the transport time each way around the wait.
+        '''
+        if not self.calls:
+            return []
+        origin = min(call[3] for call in self.calls)
+        events = []
+        for n, (operation, block, agent_id, start, rpc_start, rpc_end, end, floor) in enumerate(self.calls):
+            spans = [
+                (f'{operation} {block}', start, end, {'agent_id': agent_id}),
+                ('encode', start, rpc_start, None),
+                ('transport', rpc_start, rpc_start + floor // 2, None),
+                ('wait', rpc_start + floor // 2, rpc_end - (floor - floor // 2), None),
+                ('transport', rpc_end - (floor - floor // 2), rpc_end, None),
+                ('decode', rpc_end, end, None),
+            ]
+            for name, span_start, span_end, args in spans:
+                common = {'name': name, 'cat': operation, 'id': n, 'pid': 1, 'tid': 1}
+                begin = {**common, 'ph': 'b', 'ts': (span_start - origin) / 1e3}
+                if args:
+                    begin['args'] = args
+                events.append(begin)
+                events.append({**common, 'ph': 'e', 'ts': (span_end - origin) / 1e3})
+        return events
+
+    def write_trace(self, path: str):
+        '''
+        Write the kept calls as a JSON trace file, which chrome://tracing and https://ui.perfetto.dev can open
+        '''
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, file)
+
+
+def format_summary(rows: list[dict[str, Any]]) -> str:
+    '''
+    Format the rows of `Instrumentation.summary` as a fixed-width text table
+    '''
+    columns = ('count', 'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms')
+    width = max([len(row['block']) for row in rows] + [5])
+    lines = [f'{"operation":<10}{"block":<{width + 2}}{"phase":<11}' + ''.join(f'{c:>10}' for c in columns)]
+    for row in rows:
+        lines.append(
+            f'{row["operation"]:<10}{row["block"]:<{width + 2}}{row["phase"]:<11}{row["count"]:>10}'
+            + ''.join(f'{row[c]:>10.3f}' for c in columns[1:])
+        )
+    return '\n'.join(lines)
+
+
+class InstrumentedChannel:
+    '''
+    An async cosimulation channel whose consume and produce calls are timed by an `Instrumentation`. Other attributes
+    are those of the wrapped channel.
+    '''
+
+    def __init__(self, channel, instrumentation: Instrumentation):
+        _hook_async_rpc(channel)
+        self.channel = channel
+        self.instrumentation = instrumentation
+
+    def __getattr__(self, name: str):
+        return getattr(self.channel, name)
+
+    async def consume(self, external_state_id: str, agent_id: str, timestamp: float | None = None) -> tuple:
+        call = self.instrumentation._begin('consume', agent_id, external_state_id)
+        token = _current.set(call)
+        try:
+            values = await self.channel.consume(
+                external_state_id=external_state_id, agent_id=agent_id, timestamp=timestamp
+            )
+        finally:
+            _current.reset(token)
+        self.instrumentation._end(call)
+        return values
+
+    async def produce(
+        self,
+        external_state_id: str,
+        agent_id: str,
+        values: tuple,
+        timestamp: float | None = None,
+    ) -> Any:
+        call = self.instrumentation._begin('produce', agent_id, external_state_id)
+        token = _current.set(call)
+        try:
+            result = await self.channel.produce(
+                external_state_id=external_state_id, agent_id=agent_id, values=values, timestamp=timestamp
+            )
+        finally:
+            _current.reset(token)
+        self.instrumentation._end(call)
+        return result
+
+
+class InstrumentedHandle:
+    '''
+    A synchronous simulation handle whose consume and produce calls are timed by an `Instrumentation`. Other
+    attributes are those of the wrapped handle.
+    '''
+
+    def __init__(self, handle, instrumentation: Instrumentation):
+        _hook_sync_rpc(handle)
+        self.handle = handle
+        self.instrumentation = instrumentation
+
+    def __getattr__(self, name: str):
+        return getattr(self.handle, name)
+
+    def consume(self, agent_id: str, external_state_id: str, time: float | None = None) -> tuple:
+        call = self.instrumentation._begin('consume', agent_id, external_state_id)
+        token = _current.set(call)
+        try:
+            values = self.handle.consume(agent_id=agent_id, external_state_id=external_state_id, time=time)
+        finally:
+            _current.reset(token)
+        self.instrumentation._end(call)
+        return values
+
+    def produce(self, agent_id: str, external_state_id: str, values: tuple, timestamp: float | None = None) -> Any:
+        call = self.instrumentation._begin('produce', agent_id, external_state_id)
+        token = _current.set(call)
+        try:
+            result = self.handle.produce(
+                agent_id=agent_id, external_state_id=external_state_id, values=values, timestamp=timestamp
+            )
+        finally:
+            _current.reset(token)
+        self.instrumentation._end(call)
+        return result
@@ -0,0 +1,318 @@
+'''
+Recording and replay of the consume and produce calls of a cosimulation, so controller code can be run, profiled, and
+benchmarked offline and reproducibly.
+
+A `Recorder` wraps a synchronous `SimulationHandle` or a channel from `SimulationHandle.async_channel` and appends every
+completed call (operation, agent ID, external state block ID, start and duration, and values) to a gzip-compressed
+binary log. `ReplayHandle` and `ReplayChannel` then stand in for the handle and channel: each consume of a block returns
+the next recorded consume of that block, at the recorded pace, faster, or as fast as possible, and produced values are
+kept for comparison with the recorded ones.
+
+    with scenario.simulation.start(wait=True) as simulation_handle, Recorder('cosim.log') as recorder:
+        simulation_handle = recorder.handle(simulation_handle)
+        ...
+
+    with ReplayHandle('cosim.log', speed=None) as simulation_handle:
+        ...
+'''
+import asyncio
+import gzip
+import struct
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from time import perf_counter, perf_counter_ns, sleep
+from typing import Any, NamedTuple
+
+from common.channel import decode_values, encode_values
+
+MAGIC = b'COSIMLOG'
+VERSION = 1
+# Record kind, agent ID index, external state block ID index, start (ns), duration (ns), payload length
+_RECORD = struct.Struct('<BIIqqI')
+_CONSUME, _PRODUCE, _NAME = 0, 1, 2
+_OPERATIONS = {_CONSUME: 'consume', _PRODUCE: 'produce'}
+
+
+class CallRecord(NamedTuple):
+    '''A completed consume or produce call, with times in seconds since the recording started'''
+    operation: str
+    agent_id: str
+    external_state_id: str
+    start: float
+    duration: float
+    values: tuple
+
+
+class Recorder:
+    '''
+    Writes the consume and produce calls of the handles and channels it wraps to a log at path. Without a path nothing
+    is recorded, and wrapping returns the handle or channel itself.
+    '''
+
+    def __init__(self, path: str | Path | None):
+        self.path = path
+        self.n_calls = 0
+        self._names: dict[str, int] = {}
+        self._origin = perf_counter_ns()
+        self._file = None
+        if path is not None:
+            self._file = gzip.open(path, 'wb')
+            self._file.write(MAGIC + struct.pack('<H', VERSION))
+
+    def __enter__(self) -> 'Recorder':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def handle(self, handle):
+        '''
+        Wrap a synchronous simulation handle
+        '''
+        return handle if self.path is None else RecordingHandle(handle, self)
+
+    def channel(self, channel):
+        '''
+        Wrap an async cosimulation channel
+        '''
+        return channel if self.path is None else RecordingChannel(channel, self)
+
+    def _index(self, name: str) -> int:
+        '''
+        Helper function to get the index of an ID in the log, writing its definition the first time it is used
+        '''
+        index = self._names.get(name)
+        if index is None:
+            index = self._names[name] = len(self._names)
+            payload = name.encode()
+            self._file.write(_RECORD.pack(_NAME, index, 0, 0, 0, len(payload)) + payload)
+        return index
+
+    def record(self, operation: str, agent_id: str, external_state_id: str, start: int, end: int, values: tuple):
+        '''
+        Append a call that started and ended at the given `perf_counter_ns` times
+        '''
+        if self._file is None:
+            return
+        kind = _CONSUME if operation == 'consume' else _PRODUCE
+        payload = encode_values(values).encode()
+        agent_index, state_index = self._index(agent_id), self._index(external_state_id)
+        self._file.write(
+            _RECORD.pack(kind, agent_index, state_index, start - self._origin, end - start, len(payload)) + payload
+        )
+        self.n_calls += 1
+
+
+class RecordingChannel:
+    '''
+    An async cosimulation channel whose consume and produce calls are written to a `Recorder`. Other attributes are
+    those of the wrapped channel.
+    '''
+
+    def __init__(self, channel, recorder: Recorder):
+        self.channel = channel
+        self.recorder = recorder
+
+    def __getattr__(self, name: str):
+        return getattr(self.channel, name)
+
+    async def consume(self, external_state_id: str, agent_id: str, timestamp: float | None = None) -> tuple:
+        start = perf_counter_ns()
+        values = await self.channel.consume(external_state_id=external_state_id, agent_id=agent_id, timestamp=timestamp)
+        self.recorder.record('consume', agent_id, external_state_id, start, perf_counter_ns(), values)
+        return values
+
+    async def produce(
+        self,
+        external_state_id: str,
+        agent_id: str,
+        values: tuple,
+        timestamp: float | None = None,
+    ) -> Any:
+        start = perf_counter_ns()
+        result = await self.channel.produce(
+            external_state_id=external_state_id, agent_id=agent_id, values=values, timestamp=timestamp
+        )
+        self.recorder.record('produce', agent_id, external_state_id, start, perf_counter_ns(), values)
+        return result
+
+
+class RecordingHandle:
+    '''
+    A synchronous simulation handle whose consume and produce calls are written to a `Recorder`. Other attributes are
+    those of the wrapped handle, and channels it opens with `async_channel` are recorded too.
+    '''
+
+    def __init__(self, handle, recorder: Recorder):
+        self.handle = handle
+        self.recorder = recorder
+
+    def __getattr__(self, name: str):
+        return getattr(self.handle, name)
+
+    def consume(self, agent_id: str, external_state_id: str, time: float | None = None) -> tuple:
+        start = perf_counter_ns()
+        values = self.handle.consume(agent_id=agent_id, external_state_id=external_state_id, time=time)
+        self.recorder.record('consume', agent_id, external_state_id, start, perf_counter_ns(), values)
+        return values
+
+    def produce(self, agent_id: str, external_state_id: str, values: tuple, timestamp: float | None = None) -> Any:
+        start = perf_counter_ns()
+        result = self.handle.produce(
+            agent_id=agent_id, external_state_id=external_state_id, values=values, timestamp=timestamp
+        )
+        self.recorder.record('produce', agent_id, external_state_id, start, perf_counter_ns(), values)
+        return result
+
+    @asynccontextmanager
+    async def async_channel(self, *args, **kwargs) -> AsyncIterator[RecordingChannel]:
+        async with self.handle.async_channel(*args, **kwargs) as channel:
+            yield RecordingChannel(channel, self.recorder)
+
+
+def read_recording(path: str | Path) -> list[CallRecord]:
+    '''
+    Read the calls of a log written by a `Recorder`, in the order they completed
+    '''
+    with gzip.open(path, 'rb') as file:
+        data = file.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f'{path} is not a cosimulation log')
+    offset = len(MAGIC)
+    (version,) = struct.unpack_from('<H', data, offset)
+    if version != VERSION:
+        raise ValueError(f'Unsupported cosimulation log version {version}')
+    offset += 2
+    names: dict[int, str] = {}
+    records = []
+    while offset < len(data):
+        kind, first, second, start, duration, length = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        payload = data[offset:offset + length]
+        offset += length
+        if kind == _NAME:
+            names[first] = payload.decode()
+        else:
+            operation, values = _OPERATIONS[kind], decode_values(payload.decode())
+            records.append(CallRecord(operation, names[first], names[second], start / 1e9, duration / 1e9, values))
+    return records
+
+
+class _Replay:
+    '''
+    Helper class with the recorded consumes of each block and the produced values of a replay
+    '''
+
+    def __init__(self, recording: str | Path | list[CallRecord], speed: float | None = 1.):
+        records = read_recording(recording) if isinstance(recording, (str, Path)) else list(recording)
+        self.speed = speed
+        self.recorded_produces = [record for record in records if record.operation == 'produce']
+        self.consumes: dict[tuple[str, str], deque[CallRecord]] = {}
+        for record in sorted((record for record in records if record.operation == 'consume'), key=lambda r: r.start):
+            self.consumes.setdefault((record.agent_id, record.external_state_id), deque()).append(record)
+        self.produced: list[CallRecord] = []
+        self._origin: float | None = None
+
+    def _elapsed(self) -> float:
+        now = perf_counter()
+        if self._origin is None:
+            self._origin = now
+        return now - self._origin
+
+    def _next(self, agent_id: str, external_state_id: str) -> tuple[CallRecord, float]:
+        '''
+        Helper function to get the next recorded consume of a block and how many seconds to wait before returning it
+        '''
+        elapsed = self._elapsed()
+        queue = self.consumes.get((agent_id, external_state_id))
+        if not queue:
+            raise ConnectionError('Simulation RPC failed: the recording has no more consumes of this block')
+        record = queue.popleft()
+        if self.speed is None:
+            return record, 0.
+        return record, max(0., (record.start + record.duration) / self.speed - elapsed)
+
+    def _produce(self, agent_id: str, external_state_id: str, values: tuple) -> int:
+        start = self._elapsed()
+        self.produced.append(CallRecord('produce', agent_id, external_state_id, start, 0., values))
+        return len(self.produced)
+
+    @property
+    def finished(self) -> bool:
+        '''
+        Whether every recorded consume was replayed
+        '''
+        return not any(self.consumes.values())
+
+
+class ReplayChannel(_Replay):
+    '''
+    Stand-in for the channel of `SimulationHandle.async_channel` that replays a recording.
+
+    Args:
+        recording: The path of a log written by a `Recorder`, or its calls
+        speed: How many times faster than recorded to replay, or None to replay as fast as possible. Each consume
+            returns no earlier than its recorded end, relative to the first call of the replay.
+    '''
+
+    async def consume(self, external_state_id: str, agent_id: str, timestamp: float | None = None) -> tuple:
+        record, delay = self._next(agent_id, external_state_id)
+        if delay:
+            await asyncio.sleep(delay)
+        return record.values
+
+    async def produce(
+        self,
+        external_state_id: str,
+        agent_id: str,
+        values: tuple,
+        timestamp: float | None = None,
+    ) -> int:
+        return self._produce(agent_id, external_state_id, values)
+
+
+class ReplayHandle:
+    '''
+    Stand-in for a synchronous `SimulationHandle` that replays a recording, with the arguments of `ReplayChannel`. Its
+    status is "RUNNING" until every recorded consume was replayed, and its `async_channel` continues the same replay.
+    Other attributes are those of the `ReplayChannel`.
+    '''
+
+    def __init__(self, recording: str | Path | list[CallRecord], speed: float | None = 1.):
+        self.channel = ReplayChannel(recording, speed)
+
+    def __getattr__(self, name: str):
+        return getattr(self.channel, name)
+
+    def __enter__(self) -> 'ReplayHandle':
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def consume(self, agent_id: str, external_state_id: str, time: float | None = None) -> tuple:
+        record, delay = self.channel._next(agent_id, external_state_id)
+        if delay:
+            sleep(delay)
+        return record.values
+
+    def produce(self, agent_id: str, external_state_id: str, values: tuple, timestamp: float | None = None) -> int:
+        return self.channel._produce(agent_id, external_state_id, values)
+
+    def status(self) -> dict[str, str]:
+        return {'status': 'SUCCEEDED' if self.channel.finished else 'RUNNING'}
+
+    def terminate(self):
+        for queue in self.channel.consumes.values():
+            queue.clear()
+
+    @asynccontextmanager
+    async def async_channel(self, *args, **kwargs) -> AsyncIterator[ReplayChannel]:
+        yield self.channel
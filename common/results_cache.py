@@ -0,0 +1,447 @@
+'''
+An on-disk cache of simulation results shared by the notebooks in this repository, so analysis of a finished job never
+downloads its results twice and only reads the series it uses.
+
+Results are keyed by scenario branch, job ID, and sample rate. The first time a finished job is requested, its results
+are downloaded with `Simulation.results` and stored one column per file, as numpy arrays. Opening cached results only
+reads a small manifest, and each series is memory-mapped from its files the first time it is used, so only the pages
+actually read are loaded:
+
+    cache = ResultsCache()
+    results = cache.results(sedaro, SCENARIO_BRANCH_ID, sample_rate=32)  # the latest job, downloaded once
+    position = results.agent('LEO Target').block('root').position.eci
+    position.mjd, position.elapsed_time, position.values
+
+Cached results support the parts of the Sedaro results API used by the notebooks: `agent` on results, `block` on agent
+results, `name` and variables as attributes of block results, and `mjd`, `elapsed_time`, `values`, subseries, and
+iteration on series. Values are numpy arrays instead of lists, with vector series stacked into one array with a row per
+time.
+
+The cache holds at most max_bytes, evicting the results used least recently once a download goes over. Results of
+jobs that have not finished are returned as downloaded and not cached. The default directory is
+`~/.cache/sedaro-results` unless the SEDARO_RESULTS_CACHE environment variable is set.
+'''
+import json
+import os
+import shutil
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+DEFAULT_DIRECTORY = Path(os.environ.get('SEDARO_RESULTS_CACHE', Path.home() / '.cache' / 'sedaro-results'))
+DEFAULT_MAX_BYTES = 10 * 2**30
+MANIFEST = 'manifest.json'
+FINISHED = {'SUCCEEDED', 'FAILED', 'TERMINATED'}
+
+
+class _Store:
+    '''
+    Helper class with the files of one cached result, which memory-maps each column the first time it is read. Only
+    the directory and manifest are pickled, so results can be sent to worker processes cheaply.
+    '''
+
+    def __init__(self, directory: Path, manifest: dict):
+        self.directory = directory
+        self.manifest = manifest
+        self._arrays: dict[tuple[str, str | None], np.ndarray] = {}
+
+    def __getstate__(self) -> dict:
+        return {'directory': self.directory, 'manifest': self.manifest}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state['directory'], state['manifest'])
+
+    def _load(self, stream: str, column: str | None) -> np.ndarray:
+        key = (stream, column)
+        if key not in self._arrays:
+            entry = self.manifest['streams'][stream]
+            if column is None:
+                path, pickled = entry['index'], False
+            else:
+                path, pickled = entry['columns'][column], column in entry['objects']
+            path = self.directory / entry['directory'] / path
+            # columns of python objects, such as strings or lists, can't be memory-mapped
+            self._arrays[key] = np.load(path, allow_pickle=True) if pickled else np.load(path, mmap_mode='r')
+        return self._arrays[key]
+
+    def mjd(self, stream: str) -> np.ndarray:
+        return self._load(stream, None)
+
+    def column(self, stream: str, column: str) -> np.ndarray:
+        return self._load(stream, column)
+
+
+class CachedSeries:
+    '''
+    The time series of a variable, or of one of its subseries, in cached results
+    '''
+
+    def __init__(self, name: str, store: _Store, stream: str, column_index: dict, prefix: str):
+        self.name = name
+        self._store = store
+        self._stream = stream
+        self._column_index = column_index
+        self._prefix = prefix
+
+    def __repr__(self) -> str:
+        return f'Series({self.name})'
+
+    @property
+    def mjd(self) -> np.ndarray:
+        return self._store.mjd(self._stream)
+
+    @property
+    def elapsed_time(self) -> np.ndarray:
+        mjd = self.mjd
+        return 86400 * (mjd - mjd[0]) if len(mjd) else np.zeros(0)
+
+    @property
+    def duration(self) -> float:
+        mjd = self.mjd
+        return (mjd[-1] - mjd[0]) * 86400
+
+    @property
+    def subseries(self) -> list[str]:
+        return list(self._column_index)
+
+    def _values(self, column_index: dict, prefix: str) -> np.ndarray | dict:
+        '''
+        Helper function to read the values under a prefix, stacking vectors and matrices along the last axes
+        '''
+        if not column_index:
+            return self._store.column(self._stream, prefix)
+        if all(key.isdigit() for key in column_index):
+            parts = [self._values(column_index[key], f'{prefix}.{key}') for key in sorted(column_index, key=int)]
+            if not any(isinstance(part, dict) for part in parts):
+                return np.stack(parts, axis=-1)
+        return {key: self._values(column_index[key], f'{prefix}.{key}') for key in column_index}
+
+    @property
+    def values(self) -> np.ndarray | dict:
+        '''
+        The values at each time, or a dictionary of the values of each subseries if they are not vector components
+        '''
+        return self._values(self._column_index, self._prefix)
+
+    def __len__(self) -> int:
+        return len(self.mjd)
+
+    def __iter__(self) -> Iterator[tuple[float, float, Any]]:
+        values = self.values
+        if isinstance(values, dict):
+            raise ValueError('Select a specific subseries to iterate over.')
+        return zip(self.mjd, self.elapsed_time, values)
+
+    def __getitem__(self, subseries_name: str | int) -> 'CachedSeries':
+        subseries_name = str(subseries_name)
+        if subseries_name not in self._column_index:
+            raise ValueError(f"Subseries '{subseries_name}' not found.")
+        return CachedSeries(
+            f'{self.name}.{subseries_name}',
+            self._store,
+            self._stream,
+            self._column_index[subseries_name],
+            f'{self._prefix}.{subseries_name}',
+        )
+
+    def __getattr__(self, subseries_name: str) -> 'CachedSeries':
+        if subseries_name.startswith('_'):
+            raise AttributeError(subseries_name)
+        return self[subseries_name]
+
+    def summarize(self):
+        print(f'{self.name}: {len(self)} points' + (f', subseries {self.subseries}' if self.subseries else ''))
+
+
+class CachedBlockResult:
+    '''
+    The variables of one block of an agent in cached results
+    '''
+
+    def __init__(self, id_: str, name: str, store: _Store, column_index: dict[str, dict]):
+        self.id = id_
+        self.name = name
+        self._store = store
+        self._column_index = column_index  # by stream, then by variable and subseries
+
+    def __repr__(self) -> str:
+        return f'BlockResult({self.id})'
+
+    @property
+    def variables(self) -> list[str]:
+        return sorted(variable for index in self._column_index.values() for variable in index)
+
+    def variable(self, name: str) -> CachedSeries:
+        for stream, index in self._column_index.items():
+            if name in index:
+                prefix = name if self.id == 'root' else f'{self.id}.{name}'
+                return CachedSeries(name, self._store, stream, index[name], prefix)
+        raise ValueError(f'Variable "{name}" not found.')
+
+    def __getattr__(self, name: str) -> CachedSeries:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self.variable(name)
+
+    def __contains__(self, variable: str) -> bool:
+        return variable in self.variables
+
+    def __iter__(self) -> Iterator[CachedSeries]:
+        return (self.variable(name) for name in self.variables)
+
+    def summarize(self):
+        print(f'Block {self.id}: ' + ', '.join(self.variables))
+
+
+class CachedAgentResult:
+    '''
+    The blocks of one agent in cached results
+    '''
+
+    def __init__(self, id_: str, store: _Store):
+        self.id = id_
+        self._store = store
+        agent = store.manifest['agents'][id_]
+        self.name = agent['name']
+        self._block_names: dict[str, str] = agent.get('block_names', {})  # missing from older caches
+        known = set(agent['blocks']) - {'root'}
+        self._column_index: dict[str, dict[str, dict]] = {}
+        for stream in agent['streams']:
+            for column in store.manifest['streams'][stream]['columns']:
+                elements = column.split('.')
+                block_id, path = (elements[0], elements[1:]) if elements[0] in known else ('root', elements)
+                node = self._column_index.setdefault(block_id, {}).setdefault(stream, {})
+                for element in path:
+                    node = node.setdefault(element, {})
+
+    def __repr__(self) -> str:
+        return f'AgentResult({self.name})'
+
+    @property
+    def blocks(self) -> list[str]:
+        return sorted(self._column_index, reverse=True)
+
+    def block(self, id_: str) -> CachedBlockResult:
+        '''
+        The results of a block by ID, or by the start of its ID if only one block matches
+        '''
+        id_ = str(id_)
+        if id_ not in self._column_index:
+            matching = [block_id for block_id in self._column_index if block_id.startswith(id_)]
+            if len(matching) != 1:
+                raise ValueError(f"ID '{id_}' not found." if not matching else
+                                 f'Found multiple matching IDs for {id_}: {matching}.')
+            id_ = matching[0]
+        name = 'root' if id_ == 'root' else self._block_names.get(id_, '<Unnamed Block>')
+        return CachedBlockResult(id_, name, self._store, self._column_index[id_])
+
+    def __contains__(self, id_: str) -> bool:
+        return id_ in self._column_index
+
+    def __iter__(self) -> Iterator[CachedBlockResult]:
+        return (self.block(id_) for id_ in self.blocks)
+
+    def summarize(self):
+        print(f'Agent {self.name}: blocks ' + ', '.join(self.blocks))
+
+
+class CachedSimulationResult:
+    '''
+    Cached results of one simulation job (see the module docstring)
+    '''
+
+    def __init__(self, directory: Path):
+        with open(directory / MANIFEST, 'r') as file:
+            self._store = _Store(directory, json.load(file))
+        manifest = self._store.manifest
+        self.branch = manifest['branch']
+        self.job_id = manifest['job_id']
+        self.sample_rate = manifest['sample_rate']
+        self.status = manifest['status']
+
+    def __repr__(self) -> str:
+        return f'CachedSimulationResult(branch={self.branch}, job_id={self.job_id}, status={self.status})'
+
+    @property
+    def success(self) -> bool:
+        return self.status == 'SUCCEEDED'
+
+    def _names(self, peripheral: bool) -> tuple[str, ...]:
+        return tuple(agent['name'] for agent in self._store.manifest['agents'].values()
+                     if agent['peripheral'] == peripheral)
+
+    @property
+    def templated_agents(self) -> tuple[str, ...]:
+        return self._names(False)
+
+    @property
+    def peripheral_agents(self) -> tuple[str, ...]:
+        return self._names(True)
+
+    def agent(self, id_or_name: str) -> CachedAgentResult:
+        '''
+        The results of an agent by ID or name
+        '''
+        agents = self._store.manifest['agents']
+        if id_or_name not in agents:
+            ids = [id_ for id_, agent in agents.items() if agent['name'] == id_or_name]
+            if not ids:
+                raise ValueError(f"Agent with `id` or `name` '{id_or_name}' not found in data set.")
+            id_or_name = ids[0]
+        return CachedAgentResult(id_or_name, self._store)
+
+    def summarize(self):
+        print(f'Simulation {self.job_id} of branch {self.branch}: {self.status}')
+        if self.templated_agents:
+            print('Templated Agents: ' + ', '.join(self.templated_agents))
+        if self.peripheral_agents:
+            print('Peripheral Agents: ' + ', '.join(self.peripheral_agents))
+
+
+def _write_column(path: Path, values: np.ndarray) -> bool:
+    '''
+    Helper function to write a column, and return whether it holds python objects
+    '''
+    if values.dtype == object:
+        try:
+            converted = np.asarray(values.tolist())
+        except ValueError:  # ragged
+            converted = values
+        if converted.dtype.kind in 'biuf':  # such as numbers with None for missing values, or vectors
+            values = converted
+    np.save(path, values, allow_pickle=True)
+    return values.dtype == object
+
+
+def store_results(result, directory: Path, branch: str, job_id: str, sample_rate: int | None):
+    '''
+    Write downloaded results to a directory, one stream of one agent at a time so only one is in memory at once. Only
+    uses the public API of `SimulationResult`: its raw data frames, indexed by MJD, and the blocks of each agent.
+    '''
+    directory.mkdir(parents=True)
+    agents, streams = {}, {}
+    peripheral = set(result.peripheral_agents)
+    for name in result.templated_agents + result.peripheral_agents:
+        agent = result.agent(name)
+        agent_streams = list(agent.dataframe)
+        if not agent_streams:
+            continue
+        agent_id = agent_streams[0].split('/')[0]
+        agents[agent_id] = {
+            'name': name, 'peripheral': name in peripheral, 'blocks': list(agent.blocks), 'streams': agent_streams,
+            'block_names': {id_: agent.block(id_).name for id_ in agent.blocks if id_ != 'root'},
+        }
+        for stream in agent_streams:
+            frame = agent.dataframe[stream].compute()
+            stream_directory = f's{len(streams)}'
+            (directory / stream_directory).mkdir()
+            np.save(directory / stream_directory / 'mjd.npy', np.asarray(frame.index.values, dtype=float))
+            entry = streams[stream] = {'directory': stream_directory, 'index': 'mjd.npy', 'columns': {}, 'objects': []}
+            for k, column in enumerate(column for column in frame.columns if '/' not in column):  # skip engine ones
+                entry['columns'][column] = f'c{k}.npy'
+                if _write_column(directory / stream_directory / f'c{k}.npy', frame[column].to_numpy()):
+                    entry['objects'].append(column)
+            del frame
+    size = sum(path.stat().st_size for path in directory.rglob('*') if path.is_file())
+    manifest = {
+        'branch': branch, 'job_id': job_id, 'sample_rate': sample_rate, 'status': str(result.status),
+        'size': size, 'agents': agents, 'streams': streams,
+    }
+    with open(directory / MANIFEST, 'w') as file:
+        json.dump(manifest, file)
+
+
+class ResultsCache:
+    '''
+    Simulation results cached on disk by scenario branch, job ID, and sample rate, holding at most max_bytes (see the
+    module docstring)
+    '''
+
+    def __init__(self, directory: str | Path = DEFAULT_DIRECTORY, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory).expanduser()
+        self.max_bytes = max_bytes
+
+    def path(self, branch: str, job_id: str, sample_rate: int | None = None) -> Path:
+        return self.directory / branch / job_id / (f'rate-{sample_rate}' if sample_rate is not None else 'all')
+
+    def entries(self) -> list[tuple[Path, int, float]]:
+        '''
+        The directory, size in bytes, and time of last use of each cached result, least recently used first
+        '''
+        entries = []
+        for manifest in self.directory.glob(f'*/*/*/{MANIFEST}'):
+            try:
+                with open(manifest, 'r') as file:
+                    size = json.load(file)['size']
+                entries.append((manifest.parent, size, manifest.stat().st_mtime))
+            except (OSError, ValueError, KeyError):  # being written or removed by another process
+                continue
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def evict(self, keep: Path | None = None):
+        '''
+        Remove the least recently used results until the cache fits in max_bytes, except those at keep
+        '''
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for directory, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if directory != keep:
+                shutil.rmtree(directory, ignore_errors=True)
+                total -= size
+                for parent in (directory.parent, directory.parent.parent):  # the job and branch, once empty
+                    try:
+                        parent.rmdir()
+                    except OSError:
+                        break
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def load(self, branch: str, job_id: str, sample_rate: int | None = None) -> CachedSimulationResult | None:
+        '''
+        Cached results of a job, or None if they are not cached
+        '''
+        directory = self.path(branch, job_id, sample_rate)
+        if not (directory / MANIFEST).exists():
+            return None
+        os.utime(directory / MANIFEST)  # mark it as recently used
+        return CachedSimulationResult(directory)
+
+    def results(self, client, branch: str, job_id: str | None = None, sample_rate: int | None = None):
+        '''
+        Results of a job of a scenario branch, the latest one by default, from the cache or else downloaded with a
+        `SedaroApiClient` and cached. Results of jobs that have not finished are returned as downloaded, not cached.
+        '''
+        if job_id is not None:
+            cached = self.load(branch, job_id, sample_rate)
+            if cached is not None:
+                return cached
+        simulation = client.scenario(branch).simulation
+        if job_id is None:
+            job = simulation.status()
+            job_id = job['id']
+            cached = self.load(branch, job_id, sample_rate)
+            if cached is not None:
+                return cached
+        result = simulation.results(job_id=job_id, sampleRate=sample_rate)
+        if str(result.status) not in FINISHED:
+            return result
+
+        directory = self.path(branch, job_id, sample_rate)
+        partial = directory.with_name(f'{directory.name}.partial-{os.getpid()}-{time.monotonic_ns()}')
+        try:
+            store_results(result, partial, branch, job_id, sample_rate)
+            try:
+                partial.rename(directory)
+            except OSError:  # cached by another process in the meantime
+                shutil.rmtree(partial)
+        except BaseException:
+            shutil.rmtree(partial, ignore_errors=True)
+            raise
+        self.evict(keep=directory)
+        return self.load(branch, job_id, sample_rate)
@@ -0,0 +1,296 @@
+'''
+A small runtime for cosimulators that service several external state blocks, such as one per engine.
+
+Each registered handler services its blocks on its own task, so the rounds of independent blocks overlap instead of
+waiting behind each other:
+
+    runtime = CosimRuntime()
+    runtime.register(agent_id, gnc_state_id, update_attitude)  # consumes, calls the handler, produces what it returns
+    runtime.register(agent_id, [gnc_state_id, cdh_state_id], latest_commands, consume=False)  # only produces
+    async with simulation_handle.async_channel() as channel:
+        await runtime.run(channel)
+
+A handler is called with the consumed values of each of its blocks, in the order they were registered, or with none
+if it does not consume, and returns the values to produce to its blocks by external state block ID, or None to produce
+nothing. It may be a coroutine function, or a function to run in a thread so slow computations don't hold up the other
+handlers. A handler can also make its own requests through links from `CosimRuntime.link`.
+
+Each handler has one round in flight at a time: its next consume is only sent once its produces completed. With
+max_requests, at most that many requests of all handlers are on the channel at once, and the others wait for one to
+complete. An exception raised by a handler only affects its own round: the values last produced to its blocks are
+produced again, so a `PerRoundExternalState` block doesn't hold up the simulation, and the handler is stopped after
+max_errors consecutive ones while the others keep running. The runtime runs until the simulation terminates, which
+closes the channel with ConnectionError, until every handler stopped, or until `CosimRuntime.stop` is called.
+
+With render, the latest snapshot given to `CosimRuntime.show` is rendered at most render_rate times a second on a task
+of its own, so displaying it never holds up a round, and once more when the run ends. A snapshot must not change
+after it is shown.
+'''
+import asyncio
+import inspect
+from collections.abc import Callable, Sequence
+from contextlib import nullcontext
+from time import perf_counter
+from typing import Any
+
+from common.channel import Channel, ExternalStateLink
+
+
+class HandlerStats:
+    '''
+    Counters of one handler: completed rounds, the duration of the last one in seconds, errors raised by the handler,
+    and whether it was stopped for raising max_errors consecutive ones
+    '''
+
+    def __init__(self):
+        self.rounds = 0
+        self.round_time: float | None = None
+        self.errors = 0
+        self.last_error: Exception | None = None
+        self.failed = False
+        self.start: float | None = None
+        self.end: float | None = None
+
+    @property
+    def rounds_per_second(self) -> float:
+        '''
+        Rounds completed per second since the handler started
+        '''
+        if self.start is None:
+            return 0.
+        elapsed = (self.end or perf_counter()) - self.start
+        return self.rounds / elapsed if elapsed > 0 else 0.
+
+    def __repr__(self) -> str:
+        return (f'HandlerStats(rounds={self.rounds}, round_time={self.round_time}, errors={self.errors}, '
+                f'last_error={self.last_error!r}, failed={self.failed})')
+
+
+class _Service:
+    '''
+    Helper class with a registered handler and the links to its blocks
+    '''
+
+    def __init__(self, name: str, handler: Callable, links: list[ExternalStateLink], consume: bool, in_thread: bool):
+        self.name = name
+        self.handler = handler
+        self.links = links
+        self.consume = consume
+        self.in_thread = in_thread
+        self.stats = HandlerStats()
+        self.produced: dict[str, tuple] = {}
+
+
+class CosimRuntime:
+    '''
+    Services external state blocks on a cosimulation channel with a task per registered handler. The runtime is itself
+    a channel, forwarding requests to the channel it runs on, so `ExternalStateLink`s can be made on it before it runs.
+    '''
+
+    def __init__(
+        self,
+        max_requests: int | None = None,
+        max_errors: int = 10,
+        render: Callable[[Any], None] | None = None,
+        render_rate: float = 4.,
+    ):
+        if max_requests is not None and max_requests < 1:
+            raise ValueError(f'max_requests must be at least 1, not {max_requests}')
+        if max_errors < 1:
+            raise ValueError(f'max_errors must be at least 1, not {max_errors}')
+        if render_rate <= 0:
+            raise ValueError(f'The render rate must be positive, not {render_rate}')
+        self.max_errors = max_errors
+        self.render = render
+        self.render_rate = render_rate
+        self.snapshot = None
+        self._rendered = None
+        self.channel: Channel | None = None
+        self.services: dict[str, _Service] = {}
+        self.ended_by: ConnectionError | None = None
+        self._requests = asyncio.Semaphore(max_requests) if max_requests is not None else nullcontext()
+        self._stopped = asyncio.Event()
+
+    @property
+    def stats(self) -> dict[str, HandlerStats]:
+        '''
+        The counters of each handler by name
+        '''
+        return {name: service.stats for name, service in self.services.items()}
+
+    def link(self, agent_id: str, external_state_id: str, cache_produced: bool = False) -> ExternalStateLink:
+        '''
+        A link to a block through the runtime, for handlers that make requests of their own
+        '''
+        return ExternalStateLink(self, agent_id, external_state_id, cache_produced)
+
+    def register(
+        self,
+        agent_id: str,
+        external_state_ids: str | Sequence[str],
+        handler: Callable,
+        consume: bool = True,
+        cache_produced: bool = False,
+        in_thread: bool = False,
+        name: str | None = None,
+    ) -> str:
+        '''
+        Register a handler for the blocks of one agent, and return its name, which is the handler's by default. With
+        cache_produced, values equal to those last produced to a block are not sent again, which only suits
+        `SpontaneousExternalState` blocks. With in_thread, the handler is a function called in a separate thread.
+        '''
+        if isinstance(external_state_ids, str):
+            external_state_ids = [external_state_ids]
+        name = name or getattr(handler, '__name__', 'handler')
+        if name in self.services:
+            raise ValueError(f'A handler named {name} is already registered')
+        links = [self.link(agent_id, external_state_id, cache_produced) for external_state_id in external_state_ids]
+        self.services[name] = _Service(name, handler, links, consume, in_thread)
+        return name
+
+    async def consume(self, external_state_id: str, agent_id: str, timestamp: float | None = None) -> tuple:
+        async with self._requests:
+            return await self.channel.consume(
+                external_state_id=external_state_id, agent_id=agent_id, timestamp=timestamp
+            )
+
+    async def produce(
+        self,
+        external_state_id: str,
+        agent_id: str,
+        values: tuple,
+        timestamp: float | None = None,
+    ) -> Any:
+        async with self._requests:
+            return await self.channel.produce(
+                external_state_id=external_state_id, agent_id=agent_id, values=values, timestamp=timestamp
+            )
+
+    def show(self, snapshot: Any):
+        '''
+        Set the snapshot to render next
+        '''
+        self.snapshot = snapshot
+
+    def stop(self):
+        '''
+        End the run once the rounds in flight are cancelled. Call it from the event loop the runtime runs on.
+        '''
+        self._stopped.set()
+
+    async def _call(self, service: _Service, consumed: list[tuple]) -> dict[str, tuple] | None:
+        '''
+        Helper function to call the handler of a service and get the values to produce by block
+        '''
+        if service.in_thread:
+            produced = await asyncio.to_thread(service.handler, *consumed)
+        else:
+            produced = service.handler(*consumed)
+            if inspect.isawaitable(produced):
+                produced = await produced
+        if produced is not None:
+            unknown = set(produced) - {link.external_state_id for link in service.links}
+            if unknown:
+                raise ValueError(f'{service.name} produced values for blocks it is not registered for: {unknown}')
+        return produced
+
+    def _render_latest(self):
+        '''
+        Helper function to render the latest snapshot if it wasn't rendered yet
+        '''
+        if self.render is not None and self.snapshot is not None and self.snapshot is not self._rendered:
+            self._rendered = self.snapshot
+            self.render(self.snapshot)
+
+    async def _render_loop(self):
+        '''
+        Helper function to render the latest snapshot at a fixed rate. If rendering falls behind, frames are skipped
+        rather than caught up, so the rounds keep running between frames.
+        '''
+        loop = asyncio.get_running_loop()
+        period = 1 / self.render_rate
+        next_frame = loop.time()
+        while True:
+            self._render_latest()
+            now = loop.time()
+            next_frame = next_frame + period if next_frame + period > now else now + period
+            await asyncio.sleep(next_frame - now)
+
+    async def _produce(self, service: _Service, produced: dict[str, tuple]):
+        '''
+        Helper function to produce values to the blocks of a service at the same time
+        '''
+        await asyncio.gather(*(
+            link.produce(produced[link.external_state_id])
+            for link in service.links if produced.get(link.external_state_id) is not None
+        ))
+        service.produced.update((key, values) for key, values in produced.items() if values is not None)
+
+    async def _serve(self, service: _Service):
+        '''
+        Helper function to run the rounds of a service until it fails, and time them
+        '''
+        service.stats.start, service.stats.end = perf_counter(), None
+        try:
+            await self._rounds(service)
+        finally:
+            service.stats.end = perf_counter()
+
+    async def _rounds(self, service: _Service):
+        '''
+        Helper function to run the rounds of a service, isolating errors raised by its handler
+        '''
+        consecutive_errors = 0
+        while True:
+            start = perf_counter()
+            consumed = await asyncio.gather(*(link.consume() for link in service.links)) if service.consume else []
+            try:
+                produced = await self._call(service, consumed)
+            except ConnectionError:
+                raise
+            except Exception as e:
+                service.stats.errors += 1
+                service.stats.last_error = e
+                consecutive_errors += 1
+                if consecutive_errors >= self.max_errors:
+                    service.stats.failed = True
+                    return
+                await self._produce(service, service.produced)  # repeat the last values for the round
+                continue
+            consecutive_errors = 0
+            if produced:
+                await self._produce(service, produced)
+            service.stats.rounds += 1
+            service.stats.round_time = perf_counter() - start
+
+    async def run(self, channel: Channel) -> dict[str, HandlerStats]:
+        '''
+        Run every registered handler on the channel until the simulation terminates, every handler stopped, or the
+        runtime is stopped, and return the counters of each handler. Errors other than those raised by handlers and
+        the ConnectionError of a terminated simulation are raised.
+        '''
+        self.channel = channel
+        self.ended_by = None
+        self._stopped.clear()
+        tasks = [asyncio.create_task(self._serve(service)) for service in self.services.values()]
+        stopped = asyncio.create_task(self._stopped.wait())
+        background = [stopped] + ([asyncio.create_task(self._render_loop())] if self.render is not None else [])
+        try:
+            running = set(tasks)
+            while running and not stopped.done():
+                done, _ = await asyncio.wait(running | {stopped}, return_when=asyncio.FIRST_COMPLETED)
+                running -= done
+                if any(not task.cancelled() and task.exception() is not None for task in done - {stopped}):
+                    break
+        finally:
+            for task in tasks + background:
+                task.cancel()
+            await asyncio.gather(*tasks, *background, return_exceptions=True)
+        self._render_latest()
+        for task in tasks:
+            error = None if task.cancelled() else task.exception()
+            if isinstance(error, ConnectionError):  # the simulation terminated
+                self.ended_by = error
+            elif error is not None:
+                raise error
+        return self.stats
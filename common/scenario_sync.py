@@ -0,0 +1,357 @@
+'''
+Synchronizes the blocks of a scenario branch with a desired set of blocks, such as the orbits and agents of a
+constellation, sending only the blocks that need to be created, updated, or deleted, in requests of bounded size.
+
+Desired blocks are dictionaries like those given to `Branch.update(blocks=...)`, which reference each other through
+ref ids starting with `$`:
+
+    blocks = [
+        {'id': '$orbit-1', 'type': 'PropagatedOrbitKinematics', 'initialStateDefType': 'ORBITAL_ELEMENTS', ...},
+        {'type': 'PeripheralSpacePoint', 'name': 'Sat 1', 'kinematics': '$orbit-1'},
+    ]
+    result = sync_blocks(scenario, blocks, types=['PeripheralSpacePoint'])
+
+Named blocks are matched to the existing blocks of the same type and name, and blocks without a name, such as orbits,
+are matched to the blocks referenced by the same field of the existing blocks they were matched through. A matched
+block is updated if any of its fields differs from the existing block, and other desired blocks are created. Existing
+blocks of the given types that were not matched are deleted, along with the blocks without a name that they reference,
+if desired blocks of that type exist. Other blocks of the branch are left as they are.
+
+Requests are sent in order: creates, so that references between them are resolved even across requests, then updates,
+then deletes. Requests that fail with a transient error are retried with exponential backoff. Each request is applied
+as one transaction, so a failed one made no changes, and syncing again converges in any case since only the remaining
+differences are sent.
+
+`LocalBranch` is an in-process stand-in for a branch, for testing builders without making changes to a scenario.
+'''
+import random
+import time
+from collections.abc import Callable, Iterable, Iterator
+from copy import deepcopy
+from typing import Any, NamedTuple
+
+REF_PREFIX = '$'
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class SyncPlan(NamedTuple):
+    '''
+    The blocks to create, with ref ids, the blocks to update, in full, and the IDs of the blocks to delete, along with
+    the number of desired blocks that are already up to date and the existing ID matched to each ref id
+    '''
+    creates: list[dict]
+    updates: list[dict]
+    deletes: list[str]
+    unchanged: int
+    matched: dict[str, str]
+
+
+class SyncResult(NamedTuple):
+    '''
+    What a sync changed, the number of requests it took, and the ID of each desired block by its ref id
+    '''
+    created: int
+    updated: int
+    deleted: int
+    unchanged: int
+    requests: int
+    ids: dict[str, str]
+
+
+def is_ref(value: Any) -> bool:
+    '''
+    Whether value is a ref id, which references a block created in the same request
+    '''
+    return isinstance(value, str) and value.startswith(REF_PREFIX)
+
+
+def _substitute(value: Any, ids: dict[str, str]) -> Any:
+    '''
+    Helper function to replace the ids found in value, including dictionary keys, by their values in ids
+    '''
+    if isinstance(value, str):
+        return ids.get(value, value)
+    if isinstance(value, list):
+        return [_substitute(item, ids) for item in value]
+    if isinstance(value, dict):
+        return {ids.get(key, key): _substitute(item, ids) for key, item in value.items()}
+    return value
+
+
+def _strings(value: Any) -> Iterator[str]:
+    '''
+    Helper function to get every string in value, including dictionary keys, which is where block references are
+    '''
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield from _strings(key)
+            yield from _strings(item)
+
+
+def _pairs(desired: Any, existing: Any) -> Iterator[tuple[str, Any]]:
+    '''
+    Helper function to pair the ref ids in a desired value with what is in the same place in an existing value
+    '''
+    if is_ref(desired):
+        yield desired, existing
+    elif isinstance(desired, list) and isinstance(existing, list) and len(desired) == len(existing):
+        for desired_item, existing_item in zip(desired, existing):
+            yield from _pairs(desired_item, existing_item)
+    elif isinstance(desired, dict) and isinstance(existing, dict):
+        for key, item in desired.items():
+            if key in existing:
+                yield from _pairs(item, existing[key])
+
+
+def plan_sync(existing: dict[str, dict], desired: list[dict], types: Iterable[str]) -> SyncPlan:
+    '''
+    Compare the existing blocks of a branch, by ID, with the desired blocks (see the module docstring), where the
+    desired set is complete for the given types
+    '''
+    types = set(types)
+    blocks: dict[str, dict] = {}
+    for index, block in enumerate(desired):
+        ref = block.get('id', f'{REF_PREFIX}sync-{index}')
+        if not is_ref(ref):
+            raise ValueError(f'Desired blocks must have a ref id starting with {REF_PREFIX} or none, not {ref}')
+        if ref in blocks:
+            raise ValueError(f'Ref id {ref} is used by more than one desired block')
+        blocks[ref] = {**block, 'id': ref}
+
+    # Match named blocks by type and name
+    named = {(block['type'], block['name']): ref for ref, block in blocks.items() if 'name' in block}
+    if len(named) < sum('name' in block for block in blocks.values()):
+        raise ValueError('Desired blocks of the same type must have different names')
+    matched: dict[str, str] = {}
+    for id_, block in existing.items():
+        ref = named.get((block.get('type'), block.get('name')))
+        if ref is not None and ref not in matched:
+            matched[ref] = id_
+
+    # Match blocks without a name through the references of matched blocks
+    taken = set(matched.values())
+    queue = list(matched)
+    while queue:
+        ref = queue.pop()
+        for field, value in blocks[ref].items():
+            if field == 'id':
+                continue
+            for other, id_ in _pairs(value, existing[matched[ref]].get(field)):
+                block = blocks.get(other)
+                if (
+                    block is not None and 'name' not in block and other not in matched
+                    and id_ in existing and id_ not in taken and existing[id_].get('type') == block['type']
+                ):
+                    matched[other] = id_
+                    taken.add(id_)
+                    queue.append(other)
+
+    creates, updates, unchanged = [], [], 0
+    for ref, block in blocks.items():
+        if ref not in matched:
+            creates.append(block)
+            continue
+        id_ = matched[ref]
+        resolved = _substitute({field: value for field, value in block.items() if field != 'id'}, matched)
+        if all(existing[id_].get(field) == value for field, value in resolved.items()):
+            unchanged += 1
+        else:
+            updates.append({**existing[id_], **resolved, 'id': id_})
+
+    # Delete the unmatched blocks of the given types and the unmatched blocks without a name they reference
+    owned_types = {block['type'] for block in blocks.values() if 'name' not in block}
+    deletes: dict[str, None] = {}  # ordered, so the blocks of each deleted block tend to go in the same request
+    for id_, block in existing.items():
+        if block.get('type') not in types or id_ in taken:
+            continue
+        deletes[id_] = None
+        for other in _strings({field: value for field, value in block.items() if field != 'id'}):
+            if other in existing and other not in taken and existing[other].get('type') in owned_types:
+                deletes[other] = None
+    return SyncPlan(creates, updates, list(deletes), unchanged, matched)
+
+
+def _create_order(creates: list[dict]) -> list[dict]:
+    '''
+    Helper function to order blocks to create so that each comes after the blocks it references
+    '''
+    blocks = {block['id']: block for block in creates}
+    order, state = [], {}
+
+    def visit(ref: str):
+        if state.get(ref) == 'done':
+            return
+        if state.get(ref) == 'visiting':
+            raise ValueError(f'The blocks to create reference each other in a cycle through {ref}')
+        state[ref] = 'visiting'
+        for other in _strings({field: value for field, value in blocks[ref].items() if field != 'id'}):
+            if other in blocks:
+                visit(other)
+        state[ref] = 'done'
+        order.append(blocks[ref])
+
+    for ref in blocks:
+        visit(ref)
+    return order
+
+
+def is_transient(error: Exception) -> bool:
+    '''
+    Whether a failed request is worth retrying: connection errors, timeouts, and server errors or rate limiting
+    '''
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if type(error).__module__.split('.')[0] == 'urllib3':
+        return True
+    try:
+        return int(getattr(error, 'status', None)) in TRANSIENT_STATUSES
+    except (TypeError, ValueError):
+        return False
+
+
+def _request(branch, retries: int, backoff: float, retry: Callable[[Exception], bool], **kwargs) -> dict:
+    '''
+    Helper function to send one update request to a branch, retrying transient failures
+    '''
+    for attempt in range(retries + 1):
+        try:
+            return branch.update(**kwargs, include_response=True)
+        except Exception as e:
+            if attempt == retries or not retry(e):
+                raise
+            time.sleep(backoff * 2**attempt)
+
+
+def apply_sync(
+    branch,
+    plan: SyncPlan,
+    chunk_size: int = 500,
+    retries: int = 3,
+    backoff: float = 1.,
+    retry: Callable[[Exception], bool] = is_transient,
+) -> SyncResult:
+    '''
+    Send the changes of a plan to a branch in requests of at most chunk_size blocks, retrying each request up to
+    retries times after transient errors, waiting backoff seconds and twice as long after each retry
+    '''
+    if chunk_size < 1:
+        raise ValueError(f'The chunk size must be at least 1, not {chunk_size}')
+    ids = dict(plan.matched)
+    requests = 0
+
+    creates = _create_order(plan.creates)
+    for start in range(0, len(creates), chunk_size):
+        chunk = [_substitute(block, ids) for block in creates[start:start + chunk_size]]
+        response = _request(branch, retries, backoff, retry, blocks=chunk)
+        created = response['crud']['blocks']
+        if len(created) != len(chunk):
+            raise RuntimeError(f'Created {len(created)} blocks for a request of {len(chunk)}')
+        ids.update((block['id'], id_) for block, id_ in zip(chunk, created))
+        requests += 1
+
+    for start in range(0, len(plan.updates), chunk_size):
+        chunk = [_substitute(block, ids) for block in plan.updates[start:start + chunk_size]]
+        _request(branch, retries, backoff, retry, blocks=chunk)
+        requests += 1
+
+    for start in range(0, len(plan.deletes), chunk_size):
+        _request(branch, retries, backoff, retry, delete=plan.deletes[start:start + chunk_size])
+        requests += 1
+
+    return SyncResult(len(plan.creates), len(plan.updates), len(plan.deletes), plan.unchanged, requests, ids)
+
+
+def sync_blocks(branch, desired: list[dict], types: Iterable[str], **kwargs) -> SyncResult:
+    '''
+    Make the blocks of a branch match the desired blocks, where the desired set is complete for the given types (see
+    the module docstring). Keyword arguments are passed to apply_sync.
+    '''
+    return apply_sync(branch, plan_sync(branch.data['blocks'], desired, types), **kwargs)
+
+
+class LocalBranch:
+    '''
+    In-process stand-in for a scenario branch that supports the requests of `sync_blocks`, for testing builders without
+    making changes to a scenario.
+
+    Like a real branch, each request is applied as one transaction: ref ids are resolved to new IDs within the request,
+    and references to blocks that don't exist fail the request. Requests of more than max_blocks blocks and IDs to
+    delete fail, and with failure_rate, requests randomly fail with ConnectionError before they are applied. Every
+    request that was applied is counted in requests, with the number of blocks and IDs it carried in sent.
+    '''
+
+    def __init__(
+        self,
+        blocks: dict[str, dict] | None = None,
+        max_blocks: int | None = None,
+        failure_rate: float = 0.,
+        seed: int | None = None,
+    ):
+        self.blocks = deepcopy(blocks) if blocks is not None else {}
+        self.max_blocks = max_blocks
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.sent = 0
+        self._next_id = 0
+
+    @property
+    def data(self) -> dict[str, Any]:
+        '''
+        The blocks of the branch by ID and their IDs by type, like `Branch.data`
+        '''
+        index: dict[str, list[str]] = {}
+        for id_, block in self.blocks.items():
+            index.setdefault(block['type'], []).append(id_)
+        return {'blocks': self.blocks, 'index': index}
+
+    def update(
+        self,
+        blocks: list[dict] | None = None,
+        delete: list[str] | None = None,
+        include_response: bool = False,
+    ) -> dict | None:
+        blocks, delete = blocks or [], delete or []
+        if self.max_blocks is not None and len(blocks) + len(delete) > self.max_blocks:
+            raise ValueError(f'Request of {len(blocks) + len(delete)} blocks is over the limit of {self.max_blocks}')
+        if self.random.random() < self.failure_rate:
+            raise ConnectionError('Request failed')
+
+        refs, block_ids = {}, []
+        for block in blocks:
+            id_ = block.get('id')
+            if id_ is None or is_ref(id_):
+                new_id = f'local-{self._next_id}'
+                self._next_id += 1
+                if id_ is not None:
+                    refs[id_] = new_id
+                id_ = new_id
+            elif id_ not in self.blocks:
+                raise KeyError(f'No block with ID {id_} to update')
+            block_ids.append(id_)
+        updated = dict(self.blocks)
+        for block, id_ in zip(blocks, block_ids):
+            updated[id_] = {**_substitute(block, refs), 'id': id_}
+        for id_ in delete:
+            if id_ not in updated:
+                raise KeyError(f'No block with ID {id_} to delete')
+            del updated[id_]
+        removed = set(delete)
+        for id_, block in updated.items():
+            missing = [
+                other for field, value in block.items() if field != 'id'
+                for other in _strings(value) if is_ref(other) or other in removed
+            ]
+            if missing:
+                raise ValueError(f'Block {id_} references blocks that do not exist: {missing}')
+
+        self.blocks = updated
+        self.requests += 1
+        self.sent += len(blocks) + len(delete)
+        if include_response:
+            return {'crud': {'blocks': block_ids, 'delete': delete}}
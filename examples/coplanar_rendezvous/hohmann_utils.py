@@ -1,4 +1,6 @@
 import math
+from typing import NamedTuple
+
 import numpy as np
 
 Earth_radius_km = 6378.1363
@@ -114,3 +116,82 @@ def calc_hohmann_transfer_wait_time(chaser_radius_ER, target_radius_ER, phase_an
     wait_time = (phasing_angle_for_target(chaser_radius_ER, target_radius_ER, phase_angle_deg) - phase_angle_deg*math.pi /
                  180 + 2*math.pi*k) / (calc_circular_mean_motion(chaser_radius_ER) - calc_circular_mean_motion(target_radius_ER))
     return wait_time
+
+
+# Array versions of the functions above, which broadcast over arrays of radii, phase angles, and revolution counts k
+# like numpy ufuncs. Transfers between equal radii never line up, so their wait times are inf or nan.
+
+
+def calc_hohmann_transfer_dvs_array(chaser_radius_ER, target_radius_ER):
+    """ Array version of calc_hohmann_transfer_dvs """
+    chaser_radius_ER = np.asarray(chaser_radius_ER, dtype=float)
+    target_radius_ER = np.asarray(target_radius_ER, dtype=float)
+    a_transfer = calc_semi_major_axis_of_transfer_orbit(chaser_radius_ER, target_radius_ER)
+    v_chaser = np.sqrt(earth_u_ER / chaser_radius_ER)
+    v_target = np.sqrt(earth_u_ER / target_radius_ER)
+    v_start_transfer = np.sqrt(earth_u_ER * ((2 / chaser_radius_ER) - (1 / a_transfer)))
+    v_end_transfer = np.sqrt(earth_u_ER * ((2 / target_radius_ER) - (1 / a_transfer)))
+    return np.abs(v_start_transfer - v_chaser), np.abs(v_end_transfer - v_target)
+
+
+def calc_hohmann_transfer_time_array(chaser_radius_ER, target_radius_ER):
+    """ Array version of calc_hohmann_transfer_time """
+    a_transfer = calc_semi_major_axis_of_transfer_orbit(
+        np.asarray(chaser_radius_ER, dtype=float), np.asarray(target_radius_ER, dtype=float)
+    )
+    return np.pi * np.sqrt((a_transfer ** 3) / earth_u_ER)
+
+
+def phasing_angle_for_target_array(chaser_radius_ER, target_radius_ER, phase_angle_deg):
+    """ Array version of phasing_angle_for_target """
+    target_mean_motion = np.sqrt(earth_u_ER / np.asarray(target_radius_ER, dtype=float)**3)
+    lead_angle = calc_hohmann_transfer_time_array(chaser_radius_ER, target_radius_ER) * target_mean_motion
+    # Depends if the chaser is leading or lagging the target
+    return np.where(np.asarray(phase_angle_deg) < 0.0, np.pi - lead_angle, np.pi + lead_angle)
+
+
+def calc_hohmann_transfer_wait_time_array(chaser_radius_ER, target_radius_ER, phase_angle_deg, k):
+    """ Array version of calc_hohmann_transfer_wait_time """
+    chaser_radius_ER = np.asarray(chaser_radius_ER, dtype=float)
+    target_radius_ER = np.asarray(target_radius_ER, dtype=float)
+    mean_motion_difference = np.sqrt(earth_u_ER / chaser_radius_ER**3) - np.sqrt(earth_u_ER / target_radius_ER**3)
+    phasing_angle = phasing_angle_for_target_array(chaser_radius_ER, target_radius_ER, phase_angle_deg)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (phasing_angle - np.radians(phase_angle_deg) + 2*np.pi*np.asarray(k)) / mean_motion_difference
+
+
+class HohmannSweep(NamedTuple):
+    """ Delta-v (ER/TU) and time (TU) grids of a sweep, indexed by chaser radius, target radius, phase angle, and k """
+    dv_enter: np.ndarray
+    dv_exit: np.ndarray
+    dv_total: np.ndarray
+    transfer_time: np.ndarray
+    wait_time: np.ndarray
+    total_time: np.ndarray
+
+
+def hohmann_transfer_sweep(chaser_radii_ER, target_radii_ER, phase_angles_deg, ks):
+    """
+    Porkchop-style sweep of Hohmann transfers over every combination of chaser radius, target radius, phase angle,
+    and number of revolutions k to wait. The grids have shape (chaser, target, phase angle, k), with the delta-vs and
+    transfer times, which only depend on the radii, broadcast along the other axes without copies. Opportunities that
+    would have to start in the past (negative wait times) and those that never line up have a nan wait and total time.
+    """
+    chaser = np.asarray(chaser_radii_ER, dtype=float).reshape(-1, 1, 1, 1)
+    target = np.asarray(target_radii_ER, dtype=float).reshape(1, -1, 1, 1)
+    phase = np.asarray(phase_angles_deg, dtype=float).reshape(1, 1, -1, 1)
+    k = np.asarray(ks, dtype=float).reshape(1, 1, 1, -1)
+    shape = (chaser.shape[0], target.shape[1], phase.shape[2], k.shape[3])
+
+    dv_enter, dv_exit = calc_hohmann_transfer_dvs_array(chaser, target)
+    transfer_time = calc_hohmann_transfer_time_array(chaser, target)
+    wait_time = calc_hohmann_transfer_wait_time_array(chaser, target, phase, k)
+    wait_time[~((wait_time >= 0) & np.isfinite(wait_time))] = np.nan
+    return HohmannSweep(
+        dv_enter=np.broadcast_to(dv_enter, shape),
+        dv_exit=np.broadcast_to(dv_exit, shape),
+        dv_total=np.broadcast_to(dv_enter + dv_exit, shape),
+        transfer_time=np.broadcast_to(transfer_time, shape),
+        wait_time=wait_time,
+        total_time=wait_time + transfer_time,
+    )
@@ -0,0 +1,202 @@
+'''
+Plans servicing campaigns of coplanar Hohmann rendezvous, assigning each of N chasers to at most one of M targets and
+each target to at most one chaser. The transfers are those of `thrust_maneuver.ipynb`, for spacecraft in circular
+coplanar orbits, evaluated for every chaser x target x k candidate at once with the array functions of
+`hohmann_utils.py`, where k is the number of extra relative revolutions to wait before the first burn.
+
+Candidates are pruned in order of cost: pairs whose transfer needs more delta-v or takes longer than allowed are
+dropped before any wait times are computed, and of the remaining opportunities only those that start in the future and
+complete within the time horizon are kept. The best opportunity of each pair then enters an assignment problem solved
+with `scipy.optimize.linear_sum_assignment`.
+
+    python rendezvous_planner.py --chasers 300 --targets 300
+'''
+import argparse
+import sys
+import time
+from typing import NamedTuple
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from hohmann_utils import (Earth_radius_km, calc_hohmann_transfer_dvs_array, calc_hohmann_transfer_time_array,
+                           calc_hohmann_transfer_wait_time_array, sec_per_TU)
+
+KM_S_PER_ER_TU = Earth_radius_km / sec_per_TU
+# Cost of a pair with no feasible opportunity, which the assignment only picks when nothing else is left
+_INFEASIBLE = 1e12
+# k of a pair with no feasible opportunity, since every k from -max_k to max_k is a real number of revolutions
+NO_K = np.iinfo(np.int64).min
+
+
+class Rendezvous(NamedTuple):
+    '''A planned transfer of chaser to target, waiting wait_time seconds before the first burn'''
+    chaser: int
+    target: int
+    k: int
+    wait_time: float
+    transfer_time: float
+    total_time: float
+    dv_enter: float
+    dv_exit: float
+    dv_total: float
+    cost: float
+
+
+class Candidates(NamedTuple):
+    '''
+    The best opportunity of each chaser and target pair, in km/s and seconds, with nan for pairs that have none, or NO_K
+    for their k
+    '''
+    k: np.ndarray
+    wait_time: np.ndarray
+    transfer_time: np.ndarray
+    dv_enter: np.ndarray
+    dv_exit: np.ndarray
+    feasible: np.ndarray
+
+
+def phase_angles_deg(chaser_angles_deg: np.ndarray, target_angles_deg: np.ndarray) -> np.ndarray:
+    '''
+    Phase angle of each chaser ahead of each target, in degrees from 0 to 360, from their angles along the common
+    orbital plane, with shape (chaser, target). This is the convention of the wait time relation of hohmann_utils,
+    whose phasing angle only holds for non-negative phase angles.
+    '''
+    chaser_angles_deg = np.asarray(chaser_angles_deg, dtype=float)
+    target_angles_deg = np.asarray(target_angles_deg, dtype=float)
+    return (chaser_angles_deg[:, None] - target_angles_deg[None, :]) % 360.
+
+
+def best_opportunities(
+    chaser_radii_km: np.ndarray,
+    chaser_angles_deg: np.ndarray,
+    target_radii_km: np.ndarray,
+    target_angles_deg: np.ndarray,
+    max_dv: float = np.inf,
+    horizon: float = np.inf,
+    max_k: int = 10,
+) -> Candidates:
+    '''
+    Evaluate every chaser x target x k candidate, for k from -max_k to max_k so opportunities are found whether the
+    chaser is below or above the target, and keep the earliest completing one of each pair that needs at most max_dv
+    km/s and completes within horizon seconds. Returns grids of shape (chaser, target).
+    '''
+    chaser_radii = np.asarray(chaser_radii_km, dtype=float) / Earth_radius_km
+    target_radii = np.asarray(target_radii_km, dtype=float) / Earth_radius_km
+    shape = (len(chaser_radii), len(target_radii))
+
+    # Prune on what only depends on the radii before looking at the phasing
+    dv_enter, dv_exit = calc_hohmann_transfer_dvs_array(chaser_radii[:, None], target_radii[None, :])
+    dv_enter, dv_exit = dv_enter * KM_S_PER_ER_TU, dv_exit * KM_S_PER_ER_TU
+    transfer_time = calc_hohmann_transfer_time_array(chaser_radii[:, None], target_radii[None, :]) * sec_per_TU
+    pairs = np.nonzero((dv_enter + dv_exit <= max_dv) & (transfer_time <= horizon))
+
+    # Wait times of the remaining pairs for each k, with shape (pair, k)
+    ks = np.arange(-max_k, max_k + 1)
+    phases = phase_angles_deg(chaser_angles_deg, target_angles_deg)[pairs]
+    wait_time = calc_hohmann_transfer_wait_time_array(
+        chaser_radii[pairs[0], None], target_radii[pairs[1], None], phases[:, None], ks[None, :]
+    ) * sec_per_TU
+    usable = (wait_time >= 0) & (wait_time + transfer_time[pairs][:, None] <= horizon)
+    wait_time = np.where(usable, wait_time, np.inf)
+    best = np.argmin(wait_time, axis=1)
+    best_wait = wait_time[np.arange(len(best)), best]
+    found = np.isfinite(best_wait)
+
+    feasible = np.zeros(shape, dtype=bool)
+    feasible[pairs[0][found], pairs[1][found]] = True
+    best_k = np.full(shape, NO_K, dtype=np.int64)
+    best_k[pairs] = np.where(found, ks[best], NO_K)
+    waits = np.full(shape, np.nan)
+    waits[pairs] = np.where(found, best_wait, np.nan)
+    return Candidates(
+        k=best_k,
+        wait_time=waits,
+        transfer_time=np.where(feasible, transfer_time, np.nan),
+        dv_enter=np.where(feasible, dv_enter, np.nan),
+        dv_exit=np.where(feasible, dv_exit, np.nan),
+        feasible=feasible,
+    )
+
+
+def plan_rendezvous(
+    chaser_radii_km: np.ndarray,
+    chaser_angles_deg: np.ndarray,
+    target_radii_km: np.ndarray,
+    target_angles_deg: np.ndarray,
+    max_dv: float = np.inf,
+    horizon: float = np.inf,
+    max_k: int = 10,
+    time_weight: float = 0.,
+) -> list[Rendezvous]:
+    '''
+    Assign chasers to targets minimizing the sum of the cost of each transfer, which is its total delta-v in km/s plus
+    time_weight times its total time in seconds, using the best opportunity of each pair under the delta-v and time
+    limits (see best_opportunities). Returns the assigned transfers from lowest to highest cost. Chasers and targets
+    without a feasible opportunity, or left over when there are more of one than of the other, are not assigned.
+    '''
+    candidates = best_opportunities(
+        chaser_radii_km, chaser_angles_deg, target_radii_km, target_angles_deg, max_dv, horizon, max_k
+    )
+    total_time = candidates.wait_time + candidates.transfer_time
+    cost = candidates.dv_enter + candidates.dv_exit + time_weight * total_time
+    cost = np.where(candidates.feasible, cost, _INFEASIBLE)
+    chasers, targets = linear_sum_assignment(cost)
+    keep = candidates.feasible[chasers, targets]
+    plan = [
+        Rendezvous(
+            chaser=int(i),
+            target=int(j),
+            k=int(candidates.k[i, j]),
+            wait_time=float(candidates.wait_time[i, j]),
+            transfer_time=float(candidates.transfer_time[i, j]),
+            total_time=float(total_time[i, j]),
+            dv_enter=float(candidates.dv_enter[i, j]),
+            dv_exit=float(candidates.dv_exit[i, j]),
+            dv_total=float(candidates.dv_enter[i, j] + candidates.dv_exit[i, j]),
+            cost=float(cost[i, j]),
+        )
+        for i, j in zip(chasers[keep], targets[keep])
+    ]
+    return sorted(plan, key=lambda rendezvous: rendezvous.cost)
+
+
+def random_fleet(n: int, min_altitude_km: float, max_altitude_km: float, rng: np.random.Generator):
+    '''
+    Radii (km) and angles along the orbital plane (deg) of n spacecraft in random circular coplanar orbits
+    '''
+    return Earth_radius_km + rng.uniform(min_altitude_km, max_altitude_km, n), rng.uniform(0., 360., n)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chasers', type=int, default=200, help='number of chasers')
+    parser.add_argument('--targets', type=int, default=200, help='number of targets')
+    parser.add_argument('--max-k', type=int, default=10, help='largest number of extra relative revolutions to wait')
+    parser.add_argument('--max-dv', type=float, default=0.5, help='delta-v limit of each transfer in km/s')
+    parser.add_argument('--horizon', type=float, default=30 * 86400., help='time limit of each transfer in seconds')
+    parser.add_argument('--time-weight', type=float, default=0., help='cost of each second in km/s of delta-v')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the random fleets')
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    chaser_radii, chaser_angles = random_fleet(args.chasers, 400., 600., rng)
+    target_radii, target_angles = random_fleet(args.targets, 500., 1200., rng)
+    start = time.perf_counter()
+    plan = plan_rendezvous(
+        chaser_radii, chaser_angles, target_radii, target_angles,
+        args.max_dv, args.horizon, args.max_k, args.time_weight,
+    )
+    elapsed = time.perf_counter() - start
+
+    n_candidates = args.chasers * args.targets * (2 * args.max_k + 1)
+    print(f'Planned {len(plan)} rendezvous from {n_candidates} candidates in {elapsed:.3f}s')
+    print(f'{"chaser":>7}{"target":>7}{"k":>4}{"wait_h":>10}{"transfer_h":>12}{"dv_km_s":>10}')
+    for rendezvous in plan[:10]:
+        print(f'{rendezvous.chaser:>7}{rendezvous.target:>7}{rendezvous.k:>4}{rendezvous.wait_time / 3600:>10.2f}'
+              f'{rendezvous.transfer_time / 3600:>12.2f}{rendezvous.dv_total:>10.4f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
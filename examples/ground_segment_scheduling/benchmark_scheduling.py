@@ -0,0 +1,211 @@
+'''
+Offline benchmark of the contact scheduling pipeline in `optimization_cosimulation.ipynb`. Instead of consuming the
+projected contacts of a live cosimulation, it builds them from a synthetic Walker delta constellation and ground station
+network of configurable size with `visibility.py`, then times each stage of a scheduling round separately:
+
+- `extract`: contact_booleans_to_intervals
+- `constraints`: schedule_constraints
+- `solve`: the milp solve of solve_schedule
+- `schedule`: selected_contacts_to_schedule
+
+Results are written as JSON, and a previous results file can be given as a baseline to fail on regressions:
+
+    python benchmark_scheduling.py --output baseline.json
+    python benchmark_scheduling.py --baseline baseline.json --tolerance 1.5
+'''
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, NamedTuple
+
+import numpy as np
+
+from scenario_setup import walker_delta_elements
+from scheduling import solve_schedule
+from utils import contact_booleans_to_intervals, schedule_constraints, selected_contacts_to_schedule
+from visibility import VisibilityPredictor
+
+RESOLUTION_SECONDS = 10.
+MJD_START = 60676.
+PHASES = ('extract', 'constraints', 'solve', 'schedule')
+
+
+class BenchmarkCase(NamedTuple):
+    '''A synthetic Walker delta i: t/p/f constellation scheduled against n_stations ground stations'''
+    name: str
+    inclination: float
+    n_satellites: int
+    n_planes: int
+    phasing: int
+    n_stations: int
+
+
+CASES = [
+    BenchmarkCase('walker-24/3/3-stations-12', 60., 24, 3, 3, 12),
+    BenchmarkCase('walker-120/10/1-stations-25', 60., 120, 10, 1, 25),
+    BenchmarkCase('walker-240/12/1-stations-50', 55., 240, 12, 1, 50),
+    BenchmarkCase('walker-504/12/1-stations-50', 55., 504, 12, 1, 50),
+]
+
+
+def station_locations(n_stations: int, seed: int = 0) -> np.ndarray:
+    '''
+    Random ground station latitudes (deg), longitudes (deg), and altitudes (km), with shape (station, 3)
+    '''
+    rng = np.random.default_rng(seed)
+    latitudes = rng.uniform(-60., 70., n_stations)
+    longitudes = rng.uniform(-180., 180., n_stations)
+    return np.column_stack((latitudes, longitudes, np.zeros(n_stations)))
+
+
+def synthetic_schedule_inputs(case: BenchmarkCase, n_steps: int, seed: int = 0) -> dict[str, Any]:
+    '''
+    Build schedule inputs in the form the cosimulation consumes them from the `ContactScheduler` block: projected
+    contacts and target series, and one transmit and one receive interface linked to a target group per plane.
+    '''
+    elements = walker_delta_elements(case.inclination, case.n_satellites, case.n_planes, case.phasing)
+    antennas = [f'antenna-{k}' for k in range(case.n_stations)]
+    satellites = [f'target-{j}' for j in range(case.n_satellites)]
+    predictor = VisibilityPredictor(
+        dict(zip(satellites, elements)), dict(zip(antennas, station_locations(case.n_stations, seed))), MJD_START
+    )
+    projected_contacts = {
+        antenna: {sat: series.tolist() for sat, series in per_target.items()}
+        for antenna, per_target in predictor.projected_contacts(MJD_START, n_steps, RESOLUTION_SECONDS).items()
+    }
+    positions = predictor.positions(MJD_START, n_steps, RESOLUTION_SECONDS)
+    target_series = {sat: list(positions[j]) for j, sat in enumerate(satellites)}
+
+    sats_per_plane = case.n_satellites // case.n_planes
+    interface_ids_type = []
+    tg_targets = []
+    for plane_n in range(case.n_planes):
+        targets = satellites[plane_n*sats_per_plane:(plane_n+1)*sats_per_plane]
+        agents = [f'agent-{target}' for target in targets]
+        for interface_type in ('ScheduledTransmitInterface', 'ScheduledReceiveInterface'):
+            interface_ids_type.append((f'{interface_type}-{plane_n}', interface_type))
+            tg_targets.append((f'target-group-{plane_n}', targets, agents))
+    return {
+        'projected_contacts': projected_contacts,
+        'target_series': target_series,
+        'interface_ids_type': interface_ids_type,
+        'tg_targets': tg_targets,
+    }
+
+
+def _timed(function: Callable, *args, **kwargs) -> tuple[Any, float]:
+    '''
+    Helper function to call a function and measure its wall-clock time in seconds
+    '''
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_case(
+    case: BenchmarkCase,
+    n_steps: int = 1440,
+    minimum_uplink_steps: float = 60.,
+    repeat: int = 3,
+    time_limit: float | None = 60.,
+    seed: int = 0,
+) -> dict[str, Any]:
+    '''
+    Time each stage of one scheduling round on a synthetic case. Each stage is repeated and summarized by its minimum
+    and median time, and the size and solution quality of the problem are recorded alongside.
+    '''
+    inputs = synthetic_schedule_inputs(case, n_steps, seed)
+    times = {phase: [] for phase in PHASES}
+    for _ in range(repeat):
+        (_, C, c_location, _, c_tg, durations, contact_labels), elapsed = _timed(
+            contact_booleans_to_intervals, inputs['projected_contacts'], inputs['tg_targets']
+        )
+        times['extract'].append(elapsed)
+        constraints, elapsed = _timed(schedule_constraints, C, c_location, c_tg, durations, minimum_uplink_steps)
+        times['constraints'].append(elapsed)
+        result, elapsed = _timed(
+            solve_schedule, C, c_location, c_tg, durations, minimum_uplink_steps, time_limit, constraints
+        )
+        times['solve'].append(elapsed)
+        x = result.x if result.x is not None else np.zeros(2*len(durations))
+        schedule, elapsed = _timed(
+            selected_contacts_to_schedule, x, C, contact_labels, inputs['target_series'], inputs['interface_ids_type'],
+            inputs['tg_targets'], MJD_START, RESOLUTION_SECONDS,
+        )
+        times['schedule'].append(elapsed)
+
+    return {
+        'case': case._asdict(),
+        'n_steps': n_steps,
+        'n_contacts': len(durations),
+        'n_constraint_rows': sum(constraint.A.shape[0] for constraint in constraints),
+        'solver_status': int(result.status),
+        'downlink_steps': None if result.x is None else float(-result.fun),
+        'scheduled_contacts': len(schedule),
+        'timings': {
+            phase: {'min': min(values), 'median': statistics.median(values)} for phase, values in times.items()
+        },
+    }
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float, floor: float = 0.01) -> list[str]:
+    '''
+    Returns a description of every stage whose median time grew beyond tolerance times its baseline median (ignoring
+    stages faster than floor seconds, which are dominated by noise) and of every case solved to optimality in the
+    baseline whose solution got worse
+    '''
+    baseline_cases = {entry['case']['name']: entry for entry in baseline['cases']}
+    regressions = []
+    for entry in results['cases']:
+        name = entry['case']['name']
+        if name not in baseline_cases:
+            continue
+        reference = baseline_cases[name]
+        for phase, timing in entry['timings'].items():
+            median, reference_median = timing['median'], reference['timings'][phase]['median']
+            if median > floor and median > tolerance * reference_median:
+                regressions.append(f'{name} {phase}: {median:.3f}s vs {reference_median:.3f}s baseline')
+        if reference['solver_status'] == 0 and (entry['downlink_steps'] or 0.) < reference['downlink_steps']:
+            regressions.append(f'{name} downlink: {entry["downlink_steps"]} vs {reference["downlink_steps"]} baseline')
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', nargs='*', help='names of the cases to run (default: all)')
+    parser.add_argument('--steps', type=int, default=1440, help='schedule horizon in 10 s steps (default: 4 hours)')
+    parser.add_argument('--minimum-uplink-steps', type=float, default=60., help='uplink steps per target group')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed repetitions per case')
+    parser.add_argument('--time-limit', type=float, default=60., help='wall-clock limit for each milp solve in seconds')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the ground station locations')
+    parser.add_argument('--output', help='path to write the JSON results to')
+    parser.add_argument('--baseline', help='path of previous JSON results to check for regressions against')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed slowdown relative to the baseline')
+    args = parser.parse_args(argv)
+
+    cases = [case for case in CASES if not args.cases or case.name in args.cases]
+    results = {'platform': platform.platform(), 'python': platform.python_version(), 'cases': []}
+    print(f'{"case":<32}{"contacts":>10}' + ''.join(f'{phase:>13}' for phase in PHASES))
+    for case in cases:
+        entry = run_case(case, args.steps, args.minimum_uplink_steps, args.repeat, args.time_limit, args.seed)
+        results['cases'].append(entry)
+        print(f'{case.name:<32}{entry["n_contacts"]:>10}'
+              + ''.join(f'{entry["timings"][phase]["median"]:>12.3f}s' for phase in PHASES))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            regressions = compare_to_baseline(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f'Regression: {regression}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,8 +3,14 @@ This is the script I used to create a Walker Delta constellation of peripheral s
 need to run this script to view the analytics or perform cosimulation, but it could be helpful for creating a new,
 similar scenario.
 '''
+import sys
+from pathlib import Path
+
 import numpy as np
-from utils import sedaroLogin
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # for the helpers shared between notebooks
+from common.bootstrap import client  # noqa: E402
+from common.scenario_sync import sync_blocks  # noqa: E402
 
 # Settings
 scenario_branch_id = 'PP7kL8dmDjB5k7kprBqpZG'
@@ -31,52 +37,47 @@ def walker_delta_elements(i: float, t: int, p: int, f: int, a: float = 7000., ra
     return elements
 
 
-# We'll make the constellation and add the satellites in each plane to an agent group
-client = sedaroLogin()
-scenario = client.scenario(scenario_branch_id)
+if __name__ == '__main__':
+    # We'll make the constellation and add the satellites in each plane to an agent group
+    scenario = client().scenario(scenario_branch_id)
 
-# Clear out any existing agents
-ids_to_delete = [ag.id for ag in scenario.AgentGroup.get_all()]
-for agent in scenario.PeripheralSpacePoint.get_all():
-    ids_to_delete.append(agent.id)
-    ids_to_delete.append(agent.kinematics.id)
-if ids_to_delete:
-    scenario.update(delete=ids_to_delete)
-
-blocks_to_create = []
-sats_per_plane = int(walker_t/walker_p)
-elements = walker_delta_elements(walker_i, walker_t, walker_p, walker_f)
-i = 0
-for plane_n in range(walker_p):
-    plane_agent_ids = []
-    for satellite_number in range(sats_per_plane):
-        # Create the orbit block using the orbital elements
-        orbit = {
-            'type': 'PropagatedOrbitKinematics',
-            'initialStateDefType': 'ORBITAL_ELEMENTS',
-            'initialStateDefParams': elements[i],
-            'id': f'$-orbit-{i}'
-        }
-        blocks_to_create.append(orbit)
+    blocks_to_create = []
+    sats_per_plane = int(walker_t/walker_p)
+    elements = walker_delta_elements(walker_i, walker_t, walker_p, walker_f)
+    i = 0
+    for plane_n in range(walker_p):
+        plane_agent_ids = []
+        for satellite_number in range(sats_per_plane):
+            # Create the orbit block using the orbital elements
+            orbit = {
+                'type': 'PropagatedOrbitKinematics',
+                'initialStateDefType': 'ORBITAL_ELEMENTS',
+                'initialStateDefParams': elements[i],
+                'id': f'$-orbit-{i}'
+            }
+            blocks_to_create.append(orbit)
 
-        # Create the agent with this orbit
-        agent = {
-            'type': 'PeripheralSpacePoint',
-            'name': f'Spacecraft {plane_n+1}-{satellite_number+1}',
-            'kinematics': orbit['id'],
-            'id': f'$-agent-{i}'
+            # Create the agent with this orbit
+            agent = {
+                'type': 'PeripheralSpacePoint',
+                'name': f'Spacecraft {plane_n+1}-{satellite_number+1}',
+                'kinematics': orbit['id'],
+                'id': f'$-agent-{i}'
+            }
+            blocks_to_create.append(agent)
+            plane_agent_ids.append(agent['id'])
+            i += 1
+        # Create the agent group for this plane
+        group = {
+            'type': 'AgentGroup',
+            'name': f'Plane {plane_n+1}',
+            'agentAssociations': {id_: {'priority': i} for i, id_ in enumerate(plane_agent_ids)},
+            'agentType': 'SpaceTarget',
+            'id': f'$-group-{plane_n}'
         }
-        blocks_to_create.append(agent)
-        plane_agent_ids.append(agent['id'])
-        i += 1
-    # Create the agent group for this plane
-    group = {
-        'type': 'AgentGroup',
-        'name': f'Plane {plane_n+1}',
-        'agentAssociations': {id_: {'priority': i} for i, id_ in enumerate(plane_agent_ids)},
-        'agentType': 'SpaceTarget',
-        'id': f'$-group-{plane_n}'
-    }
-    blocks_to_create.append(group)
+        blocks_to_create.append(group)
 
-scenario.update(blocks=blocks_to_create)
+    # Only send the blocks that changed, and delete the agents, their orbits, and groups that are no longer needed
+    result = sync_blocks(scenario, blocks_to_create, types=['PeripheralSpacePoint', 'AgentGroup'])
+    print(f'Created {result.created}, updated {result.updated}, and deleted {result.deleted} blocks '
+          f'in {result.requests} requests')
@@ -0,0 +1,726 @@
+'''
+Solvers for the contact scheduling problem posed in `optimization_cosimulation.ipynb`. The solution vector x is a list of
+binaries of length 2*len(contact_intervals). The first half selects contacts for downlink and the second half selects
+contacts for uplink, and the amount of data linked down is proportional to link duration.
+'''
+import os
+import time
+from bisect import bisect_right
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, wait
+from math import ceil
+from typing import NamedTuple
+
+import numpy as np
+from scipy.optimize import Bounds, LinearConstraint, OptimizeResult, milp
+from scipy.sparse import coo_array
+from scipy.sparse.csgraph import connected_components
+
+from utils import exclusion_cliques, schedule_constraints
+
+# Largest share of all contacts that a single conflict component may hold for decomposition to be worthwhile
+MAX_COMPONENT_SHARE = 0.8
+# Shares of the remaining time budget of `anytime_schedule` given to the LP relaxation and held back from the MILP
+RELAXATION_SHARE = 0.3
+SOLVER_MARGIN = 0.1
+
+
+def solve_schedule(
+    contact_intervals: list[tuple[int, int]],
+    c_location: dict[str, list[int]],
+    c_tg: dict[str, list[int]],
+    durations: list[int],
+    minimum_uplink_steps: float | np.ndarray,
+    time_limit: float | None = None,
+    constraints: list[LinearConstraint] | None = None,
+) -> OptimizeResult:
+    '''
+    Maximize data downlink while satisfying the minimum uplink requirement of each target group, using
+    scipy.optimize.milp.
+
+    Args:
+        contact_intervals: A list of all contacts, represented as a tuple of start and stop indices
+        c_location: A dictionary of the list of contact indices for each location
+        c_tg: A dictionary of the list of contact indices for each target group
+        durations: The duration of each contact in contact_intervals
+        minimum_uplink_steps: The number of uplink steps required for each target group, either one value for all
+            groups or one value per group in the order of c_tg
+        time_limit: Optional wall-clock limit for the solver, in seconds
+        constraints: Optional constraints already built by schedule_constraints from the same arguments
+    '''
+    n_contacts = len(durations)
+    f = -np.hstack([np.asarray(durations, dtype=float), np.zeros(n_contacts)])
+    if constraints is None:
+        constraints = schedule_constraints(contact_intervals, c_location, c_tg, durations, minimum_uplink_steps)
+    options = {} if time_limit is None else {'time_limit': time_limit}
+    return milp(
+        f,  # f@x is minimized
+        integrality=np.ones(2*n_contacts),  # all params are integers
+        bounds=Bounds(0, 1),  # all params are binary
+        constraints=constraints,
+        options=options,
+    )
+
+
+def relax_schedule(
+    contact_intervals: list[tuple[int, int]],
+    c_location: dict[str, list[int]],
+    c_tg: dict[str, list[int]],
+    durations: list[int],
+    minimum_uplink_steps: float | np.ndarray,
+    time_limit: float | None = None,
+) -> OptimizeResult:
+    '''
+    Solve the LP relaxation of the contact scheduling problem. Its downlink (-result.fun) is an upper bound on the
+    downlink of any schedule.
+    '''
+    n_contacts = len(durations)
+    f = -np.hstack([np.asarray(durations, dtype=float), np.zeros(n_contacts)])
+    constraints = schedule_constraints(contact_intervals, c_location, c_tg, durations, minimum_uplink_steps)
+    options = {} if time_limit is None else {'time_limit': time_limit}
+    return milp(f, bounds=Bounds(0, 1), constraints=constraints, options=options)
+
+
+def _group_codes(groups: dict[str, list[int]], n_contacts: int) -> np.ndarray:
+    '''
+    Helper function to get the group number of each contact
+    '''
+    codes = np.full(n_contacts, -1, dtype=np.int64)
+    for number, indices in enumerate(groups.values()):
+        codes[np.asarray(indices, dtype=np.int64)] = number
+    return codes
+
+
+def conflict_components(
+    contact_intervals: list[tuple[int, int]],
+    c_location: dict[str, list[int]],
+    c_tg: dict[str, list[int]],
+) -> tuple[int, np.ndarray]:
+    '''
+    Label the connected components of the conflict graph, in which two contacts are connected if they overlap on the
+    same antenna or within the same target group. Contacts in different components never exclude each other.
+    '''
+    n_contacts = len(contact_intervals)
+    cliques = exclusion_cliques(contact_intervals, c_location) + exclusion_cliques(contact_intervals, c_tg)
+    # Chaining the members of each clique is enough to connect them
+    heads = np.concatenate([clique[:-1] for clique in cliques]) if cliques else np.zeros(0, dtype=np.int64)
+    tails = np.concatenate([clique[1:] for clique in cliques]) if cliques else np.zeros(0, dtype=np.int64)
+    graph = coo_array((np.ones(len(heads)), (heads, tails)), shape=(n_contacts, n_contacts))
+    return connected_components(graph, directed=False)
+
+
+def _balanced_batches(labels: np.ndarray, n_components: int, n_batches: int) -> np.ndarray:
+    '''
+    Assign components to batches with similar numbers of contacts, largest components first. Returns the batch of each
+    component.
+    '''
+    sizes = np.bincount(labels, minlength=n_components)
+    loads = np.zeros(n_batches, dtype=np.int64)
+    batches = np.zeros(n_components, dtype=np.int64)
+    for component in np.argsort(-sizes, kind='stable'):
+        batches[component] = batch = np.argmin(loads)
+        loads[batch] += sizes[component]
+    return batches
+
+
+def _uplink_allocation(
+    relaxation: OptimizeResult,
+    durations: np.ndarray,
+    minimum_uplink_steps: float | np.ndarray,
+    tg_codes: np.ndarray,
+    labels: np.ndarray,
+    n_tgs: int,
+    n_components: int,
+) -> np.ndarray:
+    '''
+    Coordination step for the coupling uplink constraints. The LP relaxation of the full problem decides how much uplink
+    each component should carry, and each target group's minimum uplink is split over the components holding its
+    contacts in proportion to that. Returns the requirement per target group and component.
+    '''
+    uplink_steps = relaxation.x[len(durations):] * durations
+    allocation = np.zeros((n_tgs, n_components))
+    np.add.at(allocation, (tg_codes, labels), uplink_steps)
+    totals = allocation.sum(axis=1, keepdims=True)
+    requirements = np.reshape(minimum_uplink_steps, (-1, 1)) * allocation
+    return np.divide(requirements, totals, out=np.zeros_like(allocation), where=totals > 0)
+
+
+def _solve_batch(
+    intervals: np.ndarray,
+    location_codes: np.ndarray,
+    tg_codes: np.ndarray,
+    durations: np.ndarray,
+    tg_requirements: np.ndarray,
+    time_limit: float | None,
+) -> np.ndarray | None:
+    '''
+    Worker process entry point: solve the sub-problem made up of the given contacts, with the target group requirements
+    indexed by group number. Returns None if the sub-problem could not be solved.
+    '''
+    c_location = {code: np.flatnonzero(location_codes == code) for code in np.unique(location_codes)}
+    tgs = np.unique(tg_codes)
+    c_tg = {code: np.flatnonzero(tg_codes == code) for code in tgs}
+    result = solve_schedule(intervals, c_location, c_tg, durations, tg_requirements[tgs], time_limit)
+    return result.x if result.status in (0, 1) else None
+
+
+def _solve_whole(
+    contact_intervals: list[tuple[int, int]],
+    c_location: dict[str, list[int]],
+    c_tg: dict[str, list[int]],
+    durations: np.ndarray,
+    minimum_uplink_steps: float | np.ndarray,
+    time_limit: float,
+) -> tuple[np.ndarray | None, float | None]:
+    '''
+    Worker process entry point: solve the whole problem. Returns the solution vector, if one was found, and the upper
+    bound on the downlink from the solver's dual bound, if it has one.
+    '''
+    result = solve_schedule(contact_intervals, c_location, c_tg, durations, minimum_uplink_steps, time_limit)
+    dual_bound = getattr(result, 'mip_dual_bound', None)
+    return result.x, -dual_bound if dual_bound is not None and np.isfinite(dual_bound) else None
+
+
+def _wait_for(future: Future, timeout: float):
+    '''
+    Helper function to get the result of a future within timeout seconds, or None if it isn't done by then. A solve
+    that already started can't be stopped, so it runs on in its worker and its result is ignored.
+    '''
+    done, _ = wait([future], timeout=max(timeout, 0))
+    if not done:
+        future.cancel()
+        return None
+    return future.result()
+
+
+def decomposed_schedule(
+    contact_intervals: list[tuple[int, int]],
+    c_location: dict[str, list[int]],
+    c_tg: dict[str, list[int]],
+    durations: list[int],
+    minimum_uplink_steps: float | np.ndarray,
+    executor: Executor | None = None,
+    max_workers: int | None = None,
+    time_limit: float | None = None,
+    relaxation: OptimizeResult | None = None,
+    fallback: bool = True,
+    timeout: float | None = None,
+) -> np.ndarray | None:
+    '''
+    Solve the contact scheduling problem by splitting it into the connected components of the conflict graph. Contacts
+    in different components only interact through the minimum uplink constraints, which are coordinated by
+    `_uplink_allocation`. Components are grouped into balanced batches that are solved in parallel, either on the given
+    executor or on a process pool created for this call. If one component dominates the problem, or the coordinated
+    split leaves any batch without a feasible schedule, the whole problem is solved at once instead.
+
+    Args:
+        time_limit: Optional wall-clock limit for solving all batches, in seconds
+        relaxation: The result of `relax_schedule` for this problem, if it has already been solved
+        fallback: Whether to solve the whole problem at once when the decomposition fails, rather than returning None
+        timeout: Optional wall-clock limit for waiting on the batches, in seconds, after which None is returned. The
+            solver may overrun time_limit, but not this.
+
+    Returns the solution vector of the full problem, or None if no schedule was found.
+    '''
+    n_contacts = len(durations)
+    intervals = np.asarray(contact_intervals, dtype=np.int64).reshape(-1, 2)
+    durations = np.asarray(durations)
+    location_codes = _group_codes(c_location, n_contacts)
+    tg_codes = _group_codes(c_tg, n_contacts)
+
+    def monolithic():
+        if fallback:
+            return solve_schedule(contact_intervals, c_location, c_tg, durations, minimum_uplink_steps, time_limit).x
+
+    n_components, labels = conflict_components(contact_intervals, c_location, c_tg)
+    max_workers = max_workers or os.cpu_count() or 1
+    n_batches = min(n_components, 2*max_workers)
+    # Splitting off a few small components can't speed up a problem dominated by a single component
+    if n_batches < 2 or np.bincount(labels).max() > MAX_COMPONENT_SHARE * n_contacts:
+        return monolithic()
+    if relaxation is None:
+        relaxation = relax_schedule(contact_intervals, c_location, c_tg, durations, minimum_uplink_steps, time_limit)
+    if relaxation.status != 0:
+        return monolithic()
+    allocation = _uplink_allocation(
+        relaxation, durations, minimum_uplink_steps, tg_codes, labels, len(c_tg), n_components
+    )
+
+    # Each batch must cover the requirements allocated to all of its components
+    batches = _balanced_batches(labels, n_components, n_batches)
+    contact_batches = batches[labels]
+    batch_contacts = [np.flatnonzero(contact_batches == batch) for batch in range(n_batches)]
+    # Batches run in waves of max_workers, so each wave gets its share of the time limit
+    batch_time_limit = None if time_limit is None else time_limit / ceil(n_batches / max_workers)
+    jobs = [
+        (
+            intervals[contacts],
+            location_codes[contacts],
+            tg_codes[contacts],
+            durations[contacts],
+            allocation[:, batches == batch].sum(axis=1),
+            batch_time_limit,
+        )
+        for batch, contacts in enumerate(batch_contacts)
+    ]
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+    timed_out = False
+    try:
+        futures = [executor.submit(_solve_batch, *job) for job in jobs]
+        _, not_done = wait(futures, timeout=None if timeout is None else max(timeout, 0))
+        timed_out = bool(not_done)
+        if timed_out:
+            for future in futures:
+                future.cancel()
+            return None
+        solutions = [future.result() for future in futures]
+    finally:
+        if own_executor:
+            # Batches still running after a timeout are left to finish in the background
+            executor.shutdown(wait=not timed_out, cancel_futures=True)
+
+    x = np.zeros(2*n_contacts)
+    for contacts, local_x in zip(batch_contacts, solutions):
+        if local_x is None:
+            return monolithic()
+        n_local = len(contacts)
+        x[contacts] = local_x[:n_local]
+        x[contacts + n_contacts] = local_x[n_local:]
+    return x
+
+
+def _free(busy: tuple[list[int], list[int]], start: int, stop: int) -> bool:
+    '''
+    Helper function to check whether an interval is free given the sorted, disjoint busy intervals of an entity
+    '''
+    starts, stops = busy
+    i = bisect_right(starts, start)
+    return (i == 0 or stops[i - 1] <= start) and (i == len(starts) or starts[i] >= stop)
+
+
+def _occupy(busy: tuple[list[int], list[int]], start: int, stop: int):
+    starts, stops = busy
+    i = bisect_right(starts, start)
+    starts.insert(i, start)
+    stops.insert(i, stop)
+
+
+def greedy_schedule(
+    contact_intervals: list[tuple[int, int]],
+    c_location: dict[str, list[int]],
+    c_tg: dict[str, list[int]],
+    durations: list[int],
+    minimum_uplink_steps: float | np.ndarray,
+    initial: np.ndarray | None = None,
+) -> np.ndarray:
+    '''
+    Fast heuristic schedule. Contacts are taken longest first. Uplink contacts are assigned to the target groups that are
+    still short of their minimum uplink, then downlink contacts fill the remaining antenna and target group time. The
+    result never has conflicting contacts, but may fall short of the minimum uplink.
+
+    If an initial solution vector is given, its selected contacts are assigned first, longest first, and any that
+    conflict with a longer one are dropped. The heuristic then completes the schedule around them, turning initial
+    downlinks into uplinks where target groups can't otherwise meet their minimum uplink.
+    '''
+    n_contacts = len(durations)
+    intervals = np.asarray(contact_intervals, dtype=np.int64).reshape(-1, 2)
+    starts = intervals[:, 0].tolist()
+    # A contact occupies at least the step it starts on
+    stops = np.maximum(intervals[:, 1], intervals[:, 0] + 1).tolist()
+    location_codes = _group_codes(c_location, n_contacts).tolist()
+    tg_codes = _group_codes(c_tg, n_contacts).tolist()
+    location_busy = [([], []) for _ in c_location]
+    tg_busy = [([], []) for _ in c_tg]
+    shortfall = np.broadcast_to(np.asarray(minimum_uplink_steps, dtype=float), (len(c_tg),)).copy()
+
+    x = np.zeros(2*n_contacts)
+    order = np.argsort(-np.asarray(durations), kind='stable').tolist()
+
+    def assign(i, offset):
+        location, tg = location_busy[location_codes[i]], tg_busy[tg_codes[i]]
+        if x[i] or x[i + n_contacts] or not (_free(location, starts[i], stops[i]) and _free(tg, starts[i], stops[i])):
+            return False
+        _occupy(location, starts[i], stops[i])
+        _occupy(tg, starts[i], stops[i])
+        x[i + offset] = 1
+        return True
+
+    if initial is not None:
+        initial = np.asarray(initial) > 0.5
+        for i in order:
+            if initial[i + n_contacts] and assign(i, n_contacts):
+                shortfall[tg_codes[i]] -= durations[i]
+            elif initial[i]:
+                assign(i, 0)
+    for i in order:
+        if shortfall[tg_codes[i]] > 0 and assign(i, n_contacts):
+            shortfall[tg_codes[i]] -= durations[i]
+    if initial is not None:
+        # Make up what is still missing by turning initial downlinks of the short target groups into uplinks
+        for i in order:
+            if shortfall[tg_codes[i]] > 0 and x[i]:
+                x[i], x[i + n_contacts] = 0, 1
+                shortfall[tg_codes[i]] -= durations[i]
+    for i in order:
+        assign(i, 0)
+    return x
+
+
+class ScheduleResult(NamedTuple):
+    '''
+    A schedule and what is known about its quality
+    '''
+    x: np.ndarray  # solution vector
+    downlink_steps: float  # objective value, the number of downlink steps scheduled
+    bound: float | None  # upper bound on the downlink steps of any schedule, if one was found
+    gap: float | None  # relative optimality gap, (bound - downlink_steps) / bound
+    feasible: bool  # whether every target group meets the minimum uplink
+    method: str  # 'greedy', 'milp', 'committed' if every decision was carried over from an earlier schedule, or 'draft'
+    # or 'repaired' if a draft from predicted contacts was confirmed as is or had to be repaired
+
+
+def _schedule_result(
+    x: np.ndarray,
+    c_tg: dict[str, list[int]],
+    durations: np.ndarray,
+    minimum_uplink_steps: float | np.ndarray,
+    method: str,
+) -> ScheduleResult:
+    '''
+    Helper function to round a solution vector and evaluate its downlink and whether it meets the minimum uplink
+    '''
+    x = np.round(x)
+    n_contacts = len(durations)
+    uplink_steps = np.bincount(_group_codes(c_tg, n_contacts), weights=x[n_contacts:] * durations, minlength=len(c_tg))
+    feasible = bool(np.all(uplink_steps >= minimum_uplink_steps - 1e-6))
+    return ScheduleResult(x, float(durations @ x[:n_contacts]), None, None, feasible, method)
+
+
+def match_schedule(
+    x: np.ndarray,
+    contact_intervals: np.ndarray,
+    contact_labels: list[tuple[str, str]],
+    new_intervals: np.ndarray,
+    new_labels: list[tuple[str, str]],
+) -> np.ndarray:
+    '''
+    Carry the selections of a solution vector over to a new set of contacts on the same time steps. Each selected
+    contact is mapped to the new contact of the same antenna and satellite that overlaps it the most, if there is one.
+    '''
+    n_contacts = len(contact_labels)
+    new_intervals = np.asarray(new_intervals, dtype=np.int64).reshape(-1, 2)
+    candidates: dict[tuple[str, str], list[int]] = {}
+    for j, label in enumerate(new_labels):
+        candidates.setdefault(label, []).append(j)
+
+    new_x = np.zeros(2*len(new_labels))
+    selected = np.asarray(x).reshape(2, n_contacts) > 0.5
+    for i in np.flatnonzero(selected.any(axis=0)):
+        matches = np.array(candidates.get(contact_labels[i], []), dtype=np.int64)
+        if not len(matches):
+            continue
+        # A contact occupies at least the step it starts on
+        start, stop = contact_intervals[i]
+        stops = np.maximum(new_intervals[matches, 1], new_intervals[matches, 0] + 1)
+        overlap = np.minimum(stops, max(stop, start + 1)) - np.maximum(new_intervals[matches, 0], start)
+        best = np.argmax(overlap)
+        if overlap[best] > 0:
+            new_x[matches[best] + (len(new_labels) if selected[1, i] else 0)] = 1
+    return new_x
+
+
+def anytime_schedule(
+    contact_intervals: list[tuple[int, int]],
+    c_location: dict[str, list[int]],
+    c_tg: dict[str, list[int]],
+    durations: list[int],
+    minimum_uplink_steps: float | np.ndarray,
+    time_budget: float,
+    executor: Executor | None = None,
+) -> ScheduleResult:
+    '''
+    Find the best schedule possible within a wall-clock budget, in seconds. A greedy schedule is ready almost
+    immediately. The remaining time goes to the LP relaxation, which bounds the downlink and so gives the optimality gap,
+    and then to a time-limited MILP solve, which replaces the greedy schedule if it finds a better one. The MILP is
+    solved by `decomposed_schedule`, or whole if it doesn't decompose.
+
+    The solver can overrun its time limit, such as in presolve, so every solve runs on the executor, or on a process
+    pool created for this call, and is only waited for until the budget runs out. A solve that is still running then
+    keeps its worker busy until it finishes, while the best schedule found so far is returned.
+    '''
+    deadline = time.perf_counter() + time_budget
+    durations = np.asarray(durations)
+
+    def evaluate(x, method):
+        return _schedule_result(x, c_tg, durations, minimum_uplink_steps, method)
+
+    def remaining():
+        return deadline - time.perf_counter()
+
+    best = evaluate(greedy_schedule(contact_intervals, c_location, c_tg, durations, minimum_uplink_steps), 'greedy')
+    bound = None
+    relaxation = None
+    own_executor = executor is None and remaining() > 0
+    if own_executor:
+        executor = ProcessPoolExecutor()
+    try:
+        # The relaxation only provides the bound, so most of the budget is saved for the MILP. Each solve gets a
+        # margin to finish up after its time limit before it is given up on.
+        if (wait_time := RELAXATION_SHARE * remaining()) > 0:
+            relaxation = _wait_for(executor.submit(
+                relax_schedule, contact_intervals, c_location, c_tg, durations, minimum_uplink_steps,
+                (1 - SOLVER_MARGIN) * wait_time,
+            ), wait_time)
+            if relaxation is not None and relaxation.status == 0:
+                bound = -relaxation.fun
+        if remaining() > 0 and (relaxation is None or relaxation.status != 2):
+            x = None
+            # The decomposition is coordinated by the relaxation, so it is only tried if the relaxation was solved
+            if bound is not None:
+                x = decomposed_schedule(
+                    contact_intervals, c_location, c_tg, durations, minimum_uplink_steps, executor=executor,
+                    time_limit=(1 - SOLVER_MARGIN) * remaining(), relaxation=relaxation, fallback=False,
+                    timeout=remaining(),
+                )
+            # Problems that don't decompose are solved whole with the time that is left
+            if x is None and remaining() > 0:
+                solved = _wait_for(executor.submit(
+                    _solve_whole, contact_intervals, c_location, c_tg, durations, minimum_uplink_steps,
+                    (1 - SOLVER_MARGIN) * remaining(),
+                ), remaining())
+                if solved is not None:
+                    x, milp_bound = solved
+                    if milp_bound is not None:
+                        bound = milp_bound if bound is None else min(bound, milp_bound)
+            if x is not None:
+                candidate = evaluate(x, 'milp')
+                if (candidate.feasible, candidate.downlink_steps) > (best.feasible, best.downlink_steps):
+                    best = candidate
+    finally:
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    gap = None if not bound else max(bound - best.downlink_steps, 0) / bound
+    return best._replace(bound=bound, gap=gap)
+
+class RollingHorizonScheduler:
+    '''
+    Contact scheduler that persists across cosimulation rounds. Each new horizon overlaps heavily with the previous
+    projection, so contacts that were already fully projected last round keep their committed uplink/downlink
+    decisions, and only the new tail of the horizon (plus contacts that were cut off by the end of the previous
+    horizon) is re-optimized with `anytime_schedule`. This keeps the schedule stable across period boundaries and
+    makes each solve smaller.
+
+    Contacts are matched between rounds by antenna, satellite, and absolute stop step, which stays the same for a
+    contact even if the start of the new horizon cuts off its beginning.
+
+    A schedule for the next horizon can be drafted ahead of time from predicted contacts with `draft`. When the
+    simulation's projection arrives, `schedule` carries the draft over to the projected contacts and only repairs the
+    contacts that the prediction got wrong, unless that costs more than repair_tolerance of the draft's downlink.
+    '''
+
+    def __init__(
+        self,
+        minimum_uplink_steps: float,
+        resolution_seconds: float,
+        time_budget: float,
+        executor: Executor | None = None,
+        repair_tolerance: float = 0.05,
+    ):
+        self.minimum_uplink_steps = minimum_uplink_steps
+        self.resolution_seconds = resolution_seconds
+        self.time_budget = time_budget
+        self.executor = executor
+        self.repair_tolerance = repair_tolerance
+        self.committed: dict[tuple[str, str, int], tuple[float, float]] = {}
+        self.horizon_end: int | None = None
+        self.drafted: tuple[int, np.ndarray, list[tuple[str, str]], ScheduleResult] | None = None
+
+    def _absolute_step(self, mjd: float) -> int:
+        return round(mjd * 86400 / self.resolution_seconds)
+
+    def _keys(
+        self,
+        contact_labels: list[tuple[str, str]],
+        intervals: np.ndarray,
+        offset: int,
+    ) -> list[tuple[str, str, int]]:
+        return [(antenna, target, offset + int(stop)) for (antenna, target), stop in zip(contact_labels, intervals[:, 1])]
+
+    def schedule(
+        self,
+        contact_intervals: list[tuple[int, int]],
+        c_location: dict[str, list[int]],
+        c_tg: dict[str, list[int]],
+        durations: list[int],
+        contact_labels: list[tuple[str, str]],
+        mjd_start: float,
+        n_steps: int,
+    ) -> ScheduleResult:
+        '''
+        Schedule the contacts of a new horizon of n_steps steps starting at mjd_start. The gap of the result is relative
+        to the best schedule that keeps the committed decisions.
+        '''
+        durations = np.asarray(durations)
+        intervals = np.asarray(contact_intervals, dtype=np.int64).reshape(-1, 2)
+        offset = self._absolute_step(mjd_start)
+        keys = self._keys(contact_labels, intervals, offset)
+
+        result = self._repair_draft(intervals, c_location, c_tg, durations, contact_labels, offset)
+        if result is None:
+            result = self._plan(intervals, c_location, c_tg, durations, keys)
+        self.drafted = None
+
+        n_contacts = len(durations)
+        self.committed = {key: (result.x[i], result.x[i + n_contacts]) for i, key in enumerate(keys)}
+        self.horizon_end = offset + n_steps - 1
+        return result
+
+    def draft(
+        self,
+        contact_intervals: list[tuple[int, int]],
+        c_location: dict[str, list[int]],
+        c_tg: dict[str, list[int]],
+        durations: list[int],
+        contact_labels: list[tuple[str, str]],
+        mjd_start: float,
+    ) -> ScheduleResult:
+        '''
+        Schedule predicted contacts of the next horizon ahead of time, keeping the committed decisions as `schedule`
+        would. The draft is used by the next call to `schedule` and doesn't change the committed decisions.
+        '''
+        durations = np.asarray(durations)
+        intervals = np.asarray(contact_intervals, dtype=np.int64).reshape(-1, 2)
+        offset = self._absolute_step(mjd_start)
+        keys = self._keys(contact_labels, intervals, offset)
+        result = self._plan(intervals, c_location, c_tg, durations, keys)
+        self.drafted = (offset, intervals, list(contact_labels), result)
+        return result
+
+    def _repair_draft(
+        self,
+        intervals: np.ndarray,
+        c_location: dict[str, list[int]],
+        c_tg: dict[str, list[int]],
+        durations: np.ndarray,
+        contact_labels: list[tuple[str, str]],
+        offset: int,
+    ) -> ScheduleResult | None:
+        '''
+        Carry the draft over to the projected contacts and resolve the conflicts and shortfalls caused by prediction
+        errors with the greedy heuristic. Returns None if there is no draft, or if the repaired schedule misses the
+        minimum uplink or loses more than repair_tolerance of the draft's downlink.
+        '''
+        if self.drafted is None:
+            return None
+        draft_offset, draft_intervals, draft_labels, draft = self.drafted
+        x = match_schedule(draft.x, draft_intervals + draft_offset - offset, draft_labels, intervals, contact_labels)
+        repaired = greedy_schedule(intervals, c_location, c_tg, durations, self.minimum_uplink_steps, initial=x)
+        # The draft is confirmed if every selected contact was projected and kept
+        confirmed = np.all(repaired[x > 0.5] > 0.5) and np.count_nonzero(x) == np.count_nonzero(draft.x > 0.5)
+        method = 'draft' if confirmed else 'repaired'
+        result = _schedule_result(repaired, c_tg, durations, self.minimum_uplink_steps, method)
+        if not result.feasible or result.downlink_steps < (1 - self.repair_tolerance) * draft.downlink_steps:
+            return None
+        return result
+
+    def _plan(
+        self,
+        intervals: np.ndarray,
+        c_location: dict[str, list[int]],
+        c_tg: dict[str, list[int]],
+        durations: np.ndarray,
+        keys: list[tuple[str, str, int]],
+    ) -> ScheduleResult:
+        '''
+        Schedule a horizon around the committed decisions, or from scratch if they can't be kept, within one time
+        budget for both
+        '''
+        deadline = time.perf_counter() + self.time_budget
+        n_contacts = len(durations)
+        # Decisions are kept for contacts that ended before the end of the previous horizon
+        x = np.zeros(2*n_contacts)
+        fixed = np.zeros(n_contacts, dtype=bool)
+        if self.horizon_end is not None:
+            for i, key in enumerate(keys):
+                if key[2] < self.horizon_end and key in self.committed:
+                    fixed[i] = True
+                    x[i], x[i + n_contacts] = self.committed[key]
+
+        result = None
+        if fixed.any():
+            remaining = deadline - time.perf_counter()
+            result = self._schedule_tail(intervals, c_location, c_tg, durations, x, fixed, remaining)
+        if result is None or not result.feasible:
+            # Nothing to keep, or the committed decisions leave the minimum uplink out of reach: start from scratch
+            # with the time that is left
+            result = anytime_schedule(
+                intervals, c_location, c_tg, durations, self.minimum_uplink_steps,
+                max(deadline - time.perf_counter(), 0.), self.executor,
+            )
+        return result
+
+    def _schedule_tail(
+        self,
+        intervals: np.ndarray,
+        c_location: dict[str, list[int]],
+        c_tg: dict[str, list[int]],
+        durations: np.ndarray,
+        x: np.ndarray,
+        fixed: np.ndarray,
+        time_budget: float,
+    ) -> ScheduleResult | None:
+        '''
+        Re-optimize the free contacts around the fixed decisions in x within time_budget seconds. Returns None if the
+        free contacts can't make up the minimum uplink.
+        '''
+        n_contacts = len(durations)
+        location_codes = _group_codes(c_location, n_contacts)
+        tg_codes = _group_codes(c_tg, n_contacts)
+        selected = fixed & ((x[:n_contacts] > 0.5) | (x[n_contacts:] > 0.5))
+        # Free contacts are only available where the committed contacts leave their antenna and target group free
+        starts = intervals[:, 0]
+        stops = np.maximum(intervals[:, 1], starts + 1)
+        location_busy = [([], []) for _ in c_location]
+        tg_busy = [([], []) for _ in c_tg]
+        for i in np.flatnonzero(selected):
+            _occupy(location_busy[location_codes[i]], starts[i], stops[i])
+            _occupy(tg_busy[tg_codes[i]], starts[i], stops[i])
+        free = np.array([
+            not fixed[i]
+            and _free(location_busy[location_codes[i]], starts[i], stops[i])
+            and _free(tg_busy[tg_codes[i]], starts[i], stops[i])
+            for i in range(n_contacts)
+        ], dtype=bool)
+
+        # The committed uplink counts toward each target group's minimum
+        committed_uplink = np.bincount(tg_codes, weights=x[n_contacts:] * durations * fixed, minlength=len(c_tg))
+        shortfall = np.maximum(self.minimum_uplink_steps - committed_uplink, 0)
+        contacts = np.flatnonzero(free)
+        tgs = np.unique(tg_codes[contacts])
+        if np.any(np.delete(shortfall, tgs) > 0):
+            return None
+        committed_downlink = float(durations @ (x[:n_contacts] * fixed))
+        if not len(contacts):
+            return ScheduleResult(x, committed_downlink, None, None, True, 'committed')
+        local_locations = location_codes[contacts]
+        local_tgs = tg_codes[contacts]
+        tail = anytime_schedule(
+            intervals[contacts],
+            {code: np.flatnonzero(local_locations == code) for code in np.unique(local_locations)},
+            {code: np.flatnonzero(local_tgs == code) for code in tgs},
+            durations[contacts],
+            shortfall[tgs],
+            time_budget,
+            self.executor,
+        )
+
+        x = x.copy()
+        x[contacts] = tail.x[:len(contacts)]
+        x[contacts + n_contacts] = tail.x[len(contacts):]
+        downlink_steps = tail.downlink_steps + committed_downlink
+        bound = None if tail.bound is None else tail.bound + committed_downlink
+        gap = None if not bound else max(bound - downlink_steps, 0) / bound
+        return tail._replace(x=x, downlink_steps=downlink_steps, bound=bound, gap=gap)
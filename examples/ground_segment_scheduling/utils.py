@@ -1,184 +1,220 @@
 import datetime as dt
-import json
 from collections import defaultdict
-from functools import cache
+from concurrent.futures import Executor
+from functools import lru_cache
 from typing import TYPE_CHECKING, Any
 
 import numpy as np
-import pandas as pd
-import sedaro
-from sedaro import SedaroApiClient
 
+# pandas, scipy and sedaro are imported by the functions that use them, so the scheduling workers and scripts that
+# only need the numpy helpers start without loading them
 if TYPE_CHECKING:
+    import pandas as pd
+    from scipy.optimize import LinearConstraint
+    from scipy.sparse import coo_array
     from sedaro import SedaroAgentResult
     from sedaro.branches import AgentTemplateBranch
 
 
-def sedaroLogin():
+class _BlockNames(dict):
     '''
-    Utility for credentialed access to the sedaro client
+    Helper class to look up block names from an agent's results, fetching each name only the first time it is used
     '''
-    with open('../../secrets.json', 'r') as file:
-        API_KEY = json.load(file)['API_KEY']
-    with open('../../config.json', 'r') as file:
-        HOST = json.load(file)['HOST']
-    return SedaroApiClient(api_key=API_KEY, host=HOST)
+    def __init__(self, agent_results: 'SedaroAgentResult'):
+        super().__init__()
+        self.agent_results = agent_results
 
+    def __missing__(self, id_: str) -> str:
+        name = self[id_] = self.agent_results.block(id_).name
+        return name
 
-def _parse_tuple_stream(field, key):
+
+@lru_cache(maxsize=2)
+def block_names(agent_results: 'SedaroAgentResult') -> dict[str, str]:
+    '''
+    Shared lookup of block names by id, so repeated analytics on the same results resolve each name once
+    '''
+    return _BlockNames(agent_results)
+
+
+def _parse_tuple_stream(field, key) -> tuple[np.ndarray, np.ndarray]:
     '''
-    Helper function to parse the data from the client until we improve this.
+    Helper function to parse the data from the client until we improve this. Returns the two tuple elements as arrays.
     '''
     zero = field.__getattr__(key).__getattr__('0').values
     one = field.__getattr__(key).__getattr__('1').values
-    return list(zip(zero, one))
+    return np.asarray(zero, dtype=object), np.asarray(one, dtype=object)
+
+
+def _offset_datetimes(start_dt: dt.datetime, seconds: np.ndarray) -> 'pd.DatetimeIndex':
+    '''
+    Helper function to convert elapsed seconds to datetimes in bulk
+    '''
+    import pandas as pd
+
+    return pd.Timestamp(start_dt) + pd.to_timedelta(seconds, unit='s')
 
 
 def schedule_table(gs_template: 'AgentTemplateBranch', ground_segment_results: 'SedaroAgentResult', use_interfaces: list[str] = None):
     '''
     Get schedule data in an easily plottable form
+
+    The active target of every interface is coded into one interface x time array, and a contact row is emitted for
+    each run of the same target that ends in a change of target.
     '''
+    import pandas as pd
+    from sedaro.modsim import mjd_to_datetime
+
     scheduler = gs_template.ContactScheduler.get_first()
     ai_field = ground_segment_results.block(scheduler.id).activeInterfaces
-    ts = ai_field.elapsed_time
-    start_dt = sedaro.modsim.mjd_to_datetime(ai_field.mjd[0])
+    ts = np.asarray(ai_field.elapsed_time, dtype=float)
+    start_dt = mjd_to_datetime(ai_field.mjd[0])
+    names = block_names(ground_segment_results)
 
     # Get the interfaces associated with the scheduler
     interfaces = [i.id for i in scheduler.interfaces.keys()]
     if use_interfaces is not None:
         interfaces = [i for i in interfaces if i in use_interfaces]
-    # Reconstruct dict from stream
-    active_interfaces_dict = {}
-    for id_ in interfaces:
-        active_interfaces_dict[id_] = _parse_tuple_stream(ai_field, id_)
-
-    # Helper function to get block names
-    @cache
-    def id_to_name(id_):
-        return ground_segment_results.block(id_).name
-
-    # Get table rows
-    rows = []
-    for interface_id, series in active_interfaces_dict.items():
-        start = None
-        active_target = None
-        active_antenna = None
-        for i, (target_id, antenna) in enumerate(series):
-            if pd.isna(target_id):
-                target_id = None
-            # Start tracking
-            if active_target is None and target_id is not None:
-                start = ts[i]
-                active_target = target_id
-                active_antenna = antenna
-            # Cut off tracking for old target and start new tracking
-            elif active_target != target_id:
-                if active_target is not None:
-                    rows.append({
-                        'start': start_dt + dt.timedelta(seconds=start),
-                        'end': start_dt + dt.timedelta(seconds=ts[i]),
-                        'target': id_to_name(active_target),
-                        'antenna': id_to_name(active_antenna),
-                        'interface': interface_id
-                    })
-                start = ts[i]
-                active_target = target_id
-                active_antenna = antenna
-            # Continue tracking
-            else:
-                pass
-    rows.sort(key=lambda x: x['target'])  # allows for the legend to be in target order
-    return pd.DataFrame(rows)
+    if not interfaces:
+        return pd.DataFrame(columns=['start', 'end', 'target', 'antenna', 'interface'])
+    # Reconstruct target and antenna arrays from stream, coding targets with -1 for no target
+    streams = [_parse_tuple_stream(ai_field, id_) for id_ in interfaces]
+    target_codes, target_ids = pd.factorize(np.concatenate([targets for targets, _ in streams]))
+    target_codes = target_codes.reshape(len(interfaces), -1)
+    antennas = np.stack([antennas for _, antennas in streams])
+
+    # Find the runs of each interface's target and keep those that are tracking a target and get cut off
+    n_steps = target_codes.shape[1]
+    run_starts = np.flatnonzero(np.pad(np.diff(target_codes, axis=1) != 0, ((0, 0), (1, 0)), constant_values=True))
+    run_ends = np.append(run_starts[1:], target_codes.size)
+    keep = (target_codes.flat[run_starts] >= 0) & (run_ends % n_steps != 0)
+    run_starts, run_ends = run_starts[keep], run_ends[keep]
+
+    rows = pd.DataFrame({
+        'start': _offset_datetimes(start_dt, ts[run_starts % n_steps]),
+        'end': _offset_datetimes(start_dt, ts[run_ends % n_steps]),
+        'target': [names[id_] for id_ in target_ids[target_codes.flat[run_starts]]],
+        'antenna': [names[id_] for id_ in antennas.flat[run_starts]],
+        'interface': np.asarray(interfaces, dtype=object)[run_starts // n_steps],
+    })
+    # allows for the legend to be in target order
+    return rows.sort_values('target', kind='stable', ignore_index=True)
+
+
+def _space_target_ids(ground_segment_results: 'SedaroAgentResult') -> list[str]:
+    '''
+    Helper function to get the ids of all space targets, which are the blocks with access to the comm devices. This only
+    uses the public results API, so it also works on cached results.
+    '''
+    return [id_ for id_ in ground_segment_results.blocks
+            if id_ != 'root' and 'accessPerCommDevice' in ground_segment_results.block(id_)]
 
 
-def _space_target_ids(model_dict: dict) -> list[str]:
+def _availability_rows(
+    fields: dict[str, tuple[list[str], np.ndarray]],
+    ts: np.ndarray,
+    start_dt: dt.datetime,
+) -> 'pd.DataFrame':
     '''
-    Helper function to get the ids of all space targets
+    Helper function to build the availability table of one target from its antenna x time boolean array per field
     '''
-    ids = []
-    for block in model_dict['blocks'].values():
-        if block['type'] == 'NetworkSpaceTarget':
-            ids.append(block['id'])
-    return ids
+    import pandas as pd
+
+    tables = []
+    for key, (antenna_names, series) in fields.items():
+        (antenna_indices, starts), (_, stops) = _contact_edges(series)
+        tables.append(pd.DataFrame({
+            'start': _offset_datetimes(start_dt, ts[starts]),
+            'end': _offset_datetimes(start_dt, ts[stops]),
+            'antenna': np.asarray(antenna_names, dtype=object)[antenna_indices],
+            'type': key,
+        }))
+    return pd.concat(tables, ignore_index=True)
 
 
-def target_analytics(ground_segment_results: 'SedaroAgentResult'):
+def target_analytics(ground_segment_results: 'SedaroAgentResult', executor: Executor | None = None):
+    '''
+    Access, in field of view, and connected intervals per antenna for every space target, keyed by target name
+
+    The per-target tables are built by the worker processes of `executor` if one is given.
+    '''
+    from sedaro.modsim import mjd_to_datetime
+
     # Get targets (some are generated for TG)
-    model_dict = ground_segment_results._SedaroAgentResult__initial_state
-    target_ids = _space_target_ids(model_dict)
-    target_rows = {}
-
-    # Helper function to get block names
-    @cache
-    def id_to_name(id_):
-        return ground_segment_results.block(id_).name
-
-    for i in range(len(target_ids)):
-        target_results = ground_segment_results.block(target_ids[i])
-        access_per_antenna = target_results.accessPerCommDevice.values
-        ts = target_results.accessPerCommDevice.elapsed_time
-        start_dt = sedaro.modsim.mjd_to_datetime(target_results.accessPerCommDevice.mjd[0])
-
-        def get_ranges(series: list[bool]) -> list[tuple[int, int]]:
-            ranges = []
-            start = None
-            for i, value in enumerate(series):
-                if value and start is None:
-                    start = i
-                elif not value and start is not None:
-                    ranges.append((start, i))
-                    start = None
-            if start is not None:
-                ranges.append((start, -1))
-            return ranges
-
-        def to_rows(per_antenna, key=None):
-            rows = []
-
-            for antenna_id, series in per_antenna.items():
-                for start, stop in get_ranges(series):
-                    rows.append({
-                        'start': start_dt + dt.timedelta(seconds=ts[start]),
-                        'end': start_dt + dt.timedelta(seconds=ts[stop]),
-                        'antenna': id_to_name(antenna_id),
-                        'type': key
-                    })
-            return rows
-
-        access_rows = to_rows(access_per_antenna, 'access')
-        inFov_rows = to_rows(target_results.inFovPerCommDevice.values, 'inFov')
-        connected_rows = to_rows(target_results.connectedPerCommDevice.values, 'connected')
-        df = pd.DataFrame(access_rows + inFov_rows + connected_rows)
-
-        target_rows[target_results.name] = df
-
-    return target_rows
-
-
-def get_ranges(series: list[bool]) -> list[tuple[int, int]]:
-    ranges = []
-    start = None
-    for i, value in enumerate(series):
-        if value and start is None:
-            start = i
-        elif not value and start is not None:
-            ranges.append((start, i))
-            start = None
-    if start is not None:
-        ranges.append((start, len(series)-1))
-    return ranges
+    target_ids = _space_target_ids(ground_segment_results)
+    names = block_names(ground_segment_results)
+
+    target_names = []
+    jobs = []
+    for target_id in target_ids:
+        target_results = ground_segment_results.block(target_id)
+        ts = np.asarray(target_results.accessPerCommDevice.elapsed_time, dtype=float)
+        start_dt = mjd_to_datetime(target_results.accessPerCommDevice.mjd[0])
+        fields = {}
+        for key, field in (
+            ('access', target_results.accessPerCommDevice),
+            ('inFov', target_results.inFovPerCommDevice),
+            ('connected', target_results.connectedPerCommDevice),
+        ):
+            per_antenna = field.values
+            antenna_names = [names[antenna_id] for antenna_id in per_antenna]
+            series = np.array(list(per_antenna.values()), dtype=bool).reshape(len(per_antenna), len(ts))
+            fields[key] = (antenna_names, series)
+        target_names.append(target_results.name)
+        jobs.append((fields, ts, start_dt))
+
+    tables = (executor.map if executor else map)(_availability_rows, *zip(*jobs)) if jobs else []
+    return dict(zip(target_names, tables))
+
+
+def _contact_edges(series: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Helper function to find where runs of True begin and end along the last axis of a boolean array. Returns the
+    nonzero indices of the rising and falling edges, which line up one to one in C order. A run still active at the end
+    of the series closes at its last index.
+    '''
+    n_steps = series.shape[-1]
+    padding = [(0, 0)] * (series.ndim - 1) + [(1, 1)]
+    edges = np.diff(np.pad(series, padding).view(np.int8), axis=-1)
+    starts = np.nonzero(edges == 1)
+    stops = np.nonzero(edges == -1)
+    stops[-1][stops[-1] == n_steps] = n_steps - 1
+    return starts, stops
+
+
+def get_ranges(series: list[bool]) -> np.ndarray:
+    '''
+    Returns the (start, stop) index pairs of the runs of True in a boolean series as an (n, 2) integer array
+    '''
+    (starts,), (stops,) = _contact_edges(np.asarray(series, dtype=bool))
+    return np.column_stack((starts, stops))
+
+
+def _split_by_code(codes: np.ndarray, n_groups: int) -> list[np.ndarray]:
+    '''
+    Helper function to split the indices of an array of group codes into one sorted index array per group
+    '''
+    order = np.argsort(codes, kind='stable')
+    return np.split(order, np.cumsum(np.bincount(codes, minlength=n_groups))[:-1])
 
 
 def contact_booleans_to_intervals(
         projected_contacts: dict[str, dict[str, list[bool]]],
         tg_targets: list[tuple[str, list[str], list[str]]]
     ) -> tuple[
-        dict[tuple[str, str], list[tuple[int, int]]],
-        list[tuple[int, int]],
-        dict[str, list[int]],
-        dict[str, list[int]]]:
+        dict[tuple[str, str], np.ndarray],
+        np.ndarray,
+        dict[str, np.ndarray],
+        dict[str, np.ndarray],
+        dict[str, np.ndarray],
+        np.ndarray,
+        list[tuple[str, str]]]:
     '''
     Following section 2.1 of Eddy et al
+
+    The contact series are stacked into one antenna x satellite x time boolean array so all contact windows are found
+    in a single pass. Contacts are numbered antenna first, then satellite, then time, and every index array returned is
+    a contiguous int64 array.
     '''
     # Create a map of each target to its target group
     mapped_tgs = []
@@ -187,29 +223,40 @@ def contact_booleans_to_intervals(
         if tg_id not in mapped_tgs:
             for target_id in target_ids:
                 target_map[target_id] = tg_id
-    # Reshape dictionary to be list of intervals for each target-antenna pair
-    c_t = {}
-    # Also create a flat version with views per location and satellite
-    C = []
-    contact_pairs = []
-    durations = []
-    c_location = defaultdict(list)
-    c_satellite = defaultdict(list)
-    c_tg = defaultdict(list)
-    i = 0
-    for antenna, per_target in projected_contacts.items():
+    antennas = list(projected_contacts)
+    satellites = list(dict.fromkeys(sat for per_target in projected_contacts.values() for sat in per_target))
+    tgs = list(dict.fromkeys(target_map[sat] for sat in satellites))
+    satellite_index = {sat: j for j, sat in enumerate(satellites)}
+    satellite_tgs = np.array([tgs.index(target_map[sat]) for sat in satellites], dtype=np.int64)
+
+    # Stack the series, leaving pairs that were not projected without contacts
+    n_steps = max((len(series) for per_target in projected_contacts.values() for series in per_target.values()), default=0)
+    stacked = np.zeros((len(antennas), len(satellites), n_steps), dtype=bool)
+    for a, per_target in enumerate(projected_contacts.values()):
         for sat, contact_series in per_target.items():
-            pair = (antenna, sat)
-            ranges = get_ranges(contact_series)
-            c_t[pair] = ranges
-            C.extend(ranges)
-            durations.extend([stop - start for start, stop in ranges])
-            range_indices = list(range(i, i + len(ranges)))
-            c_location[antenna].extend(range_indices)
-            c_satellite[sat].extend(range_indices)
-            c_tg[target_map[sat]].extend(range_indices)
-            contact_pairs.extend(pair for _ in range(len(ranges)))
-            i += len(ranges)
+            series = np.asarray(contact_series, dtype=bool)
+            stacked[a, satellite_index[sat], :len(series)] = series
+    (location_codes, satellite_codes, starts), (_, _, stops) = _contact_edges(stacked)
+
+    # Create a flat version with views per location, satellite and target group
+    C = np.ascontiguousarray(np.column_stack((starts, stops)), dtype=np.int64)
+    durations = np.ascontiguousarray(stops - starts, dtype=np.int64)
+    location_codes = location_codes.astype(np.int64)
+    satellite_codes = satellite_codes.astype(np.int64)
+    c_location = dict(zip(antennas, _split_by_code(location_codes, len(antennas))))
+    c_satellite = dict(zip(satellites, _split_by_code(satellite_codes, len(satellites))))
+    c_tg = dict(zip(tgs, _split_by_code(satellite_tgs[satellite_codes], len(tgs))))
+
+    # Reshape to a list of intervals for each target-antenna pair and label each contact with its pair
+    pair_codes = location_codes * len(satellites) + satellite_codes
+    pair_splits = _split_by_code(pair_codes, len(antennas) * len(satellites))
+    c_t = {
+        (antenna, sat): C[pair_splits[a * len(satellites) + satellite_index[sat]]]
+        for a, (antenna, per_target) in enumerate(projected_contacts.items())
+        for sat in per_target
+    }
+    pairs = [(antenna, sat) for antenna in antennas for sat in satellites]
+    contact_pairs = [pairs[k] for k in pair_codes.tolist()]
     return c_t, C, c_location, c_satellite, c_tg, durations, contact_pairs
 
 
@@ -233,25 +280,132 @@ def selected_contacts_to_schedule(
                 target_data[target_id]['downlinkInterface'] = interface_id
             else:
                 target_data[target_id]['uplinkInterface'] = interface_id
-    # Loop through the selected contacts and create a schedule
+    # Create a schedule entry for each selected contact, rounding the solver's near-integer solution
     n_windows = len(contact_labels)
+    selected = np.flatnonzero(np.asarray(selected_contacts, dtype=float) > 0.5)
+    intervals = np.asarray(all_contact_intervals, dtype=np.int64).reshape(-1, 2)[selected % n_windows]
+    active_intervals = mjd_start + intervals * resolution_seconds / 86400
     schedule = []
-    for i, selected in enumerate(selected_contacts):
-        if selected:
-            antenna, target = contact_labels[i % n_windows]
-            start_i, end_i = all_contact_intervals[i % n_windows]
-            start_mjd = mjd_start + start_i * resolution_seconds / 86400
-            end_mjd = mjd_start + end_i * resolution_seconds / 86400
-            entry = {
-                'groundCommDevice': antenna,
-                'targetId': target,
-                'agentId': target_data[target]['agentId'],
-                'targetPosition': target_series[target][start_i].tolist(),
-                'activeInterval': (start_mjd, end_mjd),
-            }
-            if i < n_windows:  # Downlink
-                entry['interfaceId'] = target_data[target]['downlinkInterface']
-            else:
-                entry['interfaceId'] = target_data[target]['uplinkInterface']
-            schedule.append(entry)
+    for i, (start_i, _), (start_mjd, end_mjd) in zip(selected.tolist(), intervals.tolist(), active_intervals.tolist()):
+        antenna, target = contact_labels[i % n_windows]
+        entry = {
+            'groundCommDevice': antenna,
+            'targetId': target,
+            'agentId': target_data[target]['agentId'],
+            'targetPosition': target_series[target][start_i].tolist(),
+            'activeInterval': (start_mjd, end_mjd),
+        }
+        if i < n_windows:  # Downlink
+            entry['interfaceId'] = target_data[target]['downlinkInterface']
+        else:
+            entry['interfaceId'] = target_data[target]['uplinkInterface']
+        schedule.append(entry)
     return schedule
+
+
+def _group_members(groups: dict[str, list[int]]) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Flatten a dictionary of contact indices per entity into parallel arrays of group number and contact index
+    '''
+    members = [np.asarray(indices, dtype=np.int64) for indices in groups.values()]
+    group_numbers = np.repeat(np.arange(len(members)), [len(indices) for indices in members])
+    contacts = np.concatenate(members) if members else np.zeros(0, dtype=np.int64)
+    return group_numbers, contacts
+
+
+def minimum_uplink_matrix(c_tg: dict[str, list[int]], durations: list[int]) -> 'coo_array':
+    '''
+    Returns a sparse matrix with one row per target group. Each row weighs the uplink selection of the contacts in
+    that target group by their durations, so A@x is the number of uplink steps scheduled for each target group.
+    '''
+    from scipy.sparse import coo_array
+
+    durations = np.asarray(durations)
+    n_contacts = len(durations)
+    rows, contacts = _group_members(c_tg)
+    return coo_array((durations[contacts], (rows, contacts + n_contacts)), shape=(len(c_tg), 2*n_contacts))
+
+
+def exclusion_cliques(contact_intervals: list[tuple[int, int]], entity_contacts: dict[str, list[int]]) -> list[np.ndarray]:
+    '''
+    Finds the maximal cliques of overlapping contacts for each entity with a sweep line over the contact start and stop
+    events. Any two overlapping contacts of an entity share at least one of these cliques, so allowing at most one
+    selected contact per clique rules out every conflict with fewer and tighter rows than pairwise constraints.
+    '''
+    intervals = np.asarray(contact_intervals, dtype=np.int64).reshape(-1, 2)
+    groups, contacts = _group_members(entity_contacts)
+    starts = intervals[contacts, 0]
+    # A contact occupies at least the step it starts on
+    stops = np.maximum(intervals[contacts, 1], starts + 1)
+    n_members = len(contacts)
+    event_groups = np.concatenate([groups, groups])
+    event_times = np.concatenate([starts, stops])
+    event_is_start = np.concatenate([np.ones(n_members, dtype=bool), np.zeros(n_members, dtype=bool)])
+    event_contacts = np.concatenate([contacts, contacts])
+    # Sweep each entity in time order. Stops come before starts at the same time, since touching contacts don't overlap.
+    order = np.lexsort((event_is_start, event_times, event_groups))
+    cliques = []
+    active = set()
+    growing = False
+    for is_start, contact in zip(event_is_start[order].tolist(), event_contacts[order].tolist()):
+        if is_start:
+            active.add(contact)
+            growing = True
+        else:
+            # The active contacts form a maximal clique when the first contact stops after the set has grown
+            if growing and len(active) > 1:
+                cliques.append(np.fromiter(active, dtype=np.int64, count=len(active)))
+            growing = False
+            active.discard(contact)
+    return cliques
+
+
+def exclusion_matrix(cliques: list[np.ndarray], n_contacts: int) -> 'coo_array':
+    '''
+    Returns a sparse matrix for evaluating exclusion constraints. Each row will find the sum of the contacts in one clique
+    of conflicting contacts, including uplink, so this matrix can be used to create an efficient LinearConstraint to
+    enforce A@x <= 1.
+    '''
+    from scipy.sparse import coo_array
+
+    rows = np.repeat(np.arange(len(cliques)), [len(clique) for clique in cliques])
+    contacts = np.concatenate(cliques) if cliques else np.zeros(0, dtype=np.int64)
+    return coo_array(
+        (np.ones(2*len(contacts)), (np.tile(rows, 2), np.concatenate([contacts, contacts + n_contacts]))),
+        shape=(len(cliques), 2*n_contacts),
+    )
+
+
+def schedule_constraints(
+    contact_intervals: list[tuple[int, int]],
+    c_location: dict[str, list[int]],
+    c_tg: dict[str, list[int]],
+    durations: list[int],
+    minimum_uplink_steps: float,
+) -> list['LinearConstraint']:
+    '''
+    Assemble the sparse constraints of the contact scheduling problem of Eddy et al. for a solution vector of length
+    2*len(contact_intervals), where the first half selects contacts for downlink and the second half for uplink.
+
+    Args:
+        contact_intervals: A list of all contacts, represented as a tuple of start and stop indices
+        c_location: A dictionary of the list of contact indices for each location
+        c_tg: A dictionary of the list of contact indices for each target group
+        durations: The duration of each contact in contact_intervals
+        minimum_uplink_steps: The number of uplink steps required for each target group
+    '''
+    from scipy.optimize import LinearConstraint
+
+    constraints = []
+    # The first constraint is the minimum uplink requirement per plane
+    if c_tg:
+        constraints.append(LinearConstraint(minimum_uplink_matrix(c_tg, durations).tocsr(), lb=minimum_uplink_steps))
+    # The second is that each antenna can only communicate with one spacecraft at a time, based on eqn. 11
+    # The third is like it. Eddy et al. require each spacecraft only communicate with one antenna at a time (eqn. 12),
+    # but we require the stronger condition that each target group communicate with one antenna at a time. Both are
+    # expressed as one row per maximal clique of overlapping contacts, dropping cliques shared by an antenna and a group.
+    cliques = exclusion_cliques(contact_intervals, c_location) + exclusion_cliques(contact_intervals, c_tg)
+    cliques = [np.array(clique) for clique in dict.fromkeys(tuple(np.sort(clique).tolist()) for clique in cliques)]
+    if cliques:
+        constraints.append(LinearConstraint(exclusion_matrix(cliques, len(durations)).tocsr(), ub=1))
+    return constraints
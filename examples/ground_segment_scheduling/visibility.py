@@ -0,0 +1,180 @@
+'''
+Local prediction of the contacts that the `ContactScheduler` block projects. Satellites are propagated in one batch from
+their orbital elements with two-body motion plus the secular effects of J2, and their visibility from every ground
+station above a minimum elevation is computed in one vectorized pass. The predictions are in the same form as the
+consumed `projectedContacts`, so a schedule can be drafted before the simulation asks for one.
+'''
+import numpy as np
+
+EARTH_RADIUS = 6378.137  # km, WGS84 equatorial radius
+EARTH_FLATTENING = 1/298.257223563
+EARTH_MU = 398600.4418  # km^3/s^2
+EARTH_J2 = 1.08262668e-3
+# Upper limit on the number of station-satellite-time samples evaluated at once, to bound memory use
+MAX_CHUNK_SAMPLES = 2**24
+
+
+def _element_arrays(elements: list[dict]) -> tuple[np.ndarray, ...]:
+    '''
+    Helper function to get the semi-major axis (km), eccentricity, and angles (rad) of a list of orbital elements as
+    column vectors
+    '''
+    a, e, inc, raan, om, nu = (
+        np.array([float(el[key]) for el in elements])[:, None] for key in ('a', 'e', 'inc', 'raan', 'om', 'nu')
+    )
+    return a, e, np.radians(inc), np.radians(raan), np.radians(om), np.radians(nu)
+
+
+def propagate(elements: list[dict], seconds: np.ndarray) -> np.ndarray:
+    '''
+    Inertial positions in km at the given seconds since the epoch of the elements, with shape (satellite, time, 3). The
+    right ascension of the ascending node, argument of periapsis, and mean anomaly drift at their J2 secular rates.
+    '''
+    a, e, inc, raan, om, nu = _element_arrays(elements)
+    n = np.sqrt(EARTH_MU / a**3)
+    p = a * (1 - e**2)
+    j2_factor = 1.5 * EARTH_J2 * (EARTH_RADIUS / p)**2
+    cos_inc = np.cos(inc)
+    raan = raan - j2_factor * n * cos_inc * seconds
+    om = om + 0.5 * j2_factor * n * (5 * cos_inc**2 - 1) * seconds
+    mean_anomaly_rate = n * (1 + 0.5 * j2_factor * np.sqrt(1 - e**2) * (3 * cos_inc**2 - 1))
+
+    # Mean anomaly at epoch, then solve Kepler's equation by Newton's method
+    E = 2 * np.arctan(np.sqrt((1 - e) / (1 + e)) * np.tan(nu / 2))
+    M = E - e * np.sin(E) + mean_anomaly_rate * seconds
+    E = M.copy()
+    for _ in range(8):
+        E -= (E - e * np.sin(E) - M) / (1 - e * np.cos(E))
+    nu = 2 * np.arctan2(np.sqrt(1 + e) * np.sin(E / 2), np.sqrt(1 - e) * np.cos(E / 2))
+    r = a * (1 - e * np.cos(E))
+
+    u = om + nu
+    return r[..., None] * np.stack([
+        np.cos(raan) * np.cos(u) - np.sin(raan) * np.sin(u) * cos_inc,
+        np.sin(raan) * np.cos(u) + np.cos(raan) * np.sin(u) * cos_inc,
+        np.broadcast_to(np.sin(u) * np.sin(inc), u.shape),
+    ], axis=-1)
+
+
+def earth_rotation_angle(mjd: np.ndarray) -> np.ndarray:
+    '''
+    Earth rotation angle in radians at the given UT1 modified Julian dates
+    '''
+    return 2 * np.pi * ((0.7790572732640 + 1.00273781191135448 * (np.asarray(mjd) - 51544.5)) % 1)
+
+
+def inertial_to_fixed(positions: np.ndarray, mjd: np.ndarray) -> np.ndarray:
+    '''
+    Rotate (..., time, 3) inertial positions into the Earth-fixed frame, neglecting precession, nutation, and polar
+    motion
+    '''
+    theta = earth_rotation_angle(mjd)
+    cos, sin = np.cos(theta)[:, None], np.sin(theta)[:, None]
+    x, y, z = positions[..., 0:1], positions[..., 1:2], positions[..., 2:3]
+    return np.concatenate([cos * x + sin * y, cos * y - sin * x, z], axis=-1)
+
+
+def station_frames(locations: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Earth-fixed positions in km and local up unit vectors of ground stations given their geodetic latitude (deg),
+    longitude (deg), and altitude (km) in rows
+    '''
+    lat, lon = np.radians(locations[:, 0]), np.radians(locations[:, 1])
+    alt = locations[:, 2]
+    e2 = EARTH_FLATTENING * (2 - EARTH_FLATTENING)
+    N = EARTH_RADIUS / np.sqrt(1 - e2 * np.sin(lat)**2)
+    up = np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+    positions = np.column_stack([
+        (N + alt) * np.cos(lat) * np.cos(lon),
+        (N + alt) * np.cos(lat) * np.sin(lon),
+        (N * (1 - e2) + alt) * np.sin(lat),
+    ])
+    return positions, up
+
+
+def elevation_mask(
+    fixed_positions: np.ndarray,
+    station_positions: np.ndarray,
+    station_up: np.ndarray,
+    min_elevation: float | np.ndarray,
+) -> np.ndarray:
+    '''
+    Whether each satellite is above the minimum elevation (deg, one value or one per station) of each station, with
+    shape (station, satellite, time). The sine of the elevation of every sample comes from dot products with the station
+    positions and up vectors, computed for as many satellites at a time as fit in MAX_CHUNK_SAMPLES.
+    '''
+    n_satellites, n_steps, _ = fixed_positions.shape
+    n_stations = len(station_positions)
+    sin_min = np.sin(np.radians(np.broadcast_to(np.asarray(min_elevation, dtype=float), (n_stations,))))
+    station_height = np.einsum('ij,ij->i', station_positions, station_up)
+    station_norm2 = np.einsum('ij,ij->i', station_positions, station_positions)
+    visible = np.empty((n_stations, n_satellites, n_steps), dtype=bool)
+    chunk = max(1, MAX_CHUNK_SAMPLES // max(1, n_steps * n_stations))
+    for first in range(0, n_satellites, chunk):
+        r = fixed_positions[first:first + chunk]
+        height = r @ station_up.T - station_height
+        distance2 = np.einsum('stk,stk->st', r, r)[..., None] - 2 * (r @ station_positions.T) + station_norm2
+        visible[:, first:first + chunk] = np.moveaxis(height >= sin_min * np.sqrt(distance2), -1, 0)
+    return visible
+
+
+class VisibilityPredictor:
+    '''
+    Predicts projected contacts between satellites and ground station antennas.
+
+    Args:
+        elements: Orbital elements (a in km, e, and inc, raan, om, nu in degrees) of each target at the epoch, by target
+            ID
+        stations: The geodetic latitude (deg), longitude (deg), and altitude (km) of each antenna, by antenna ID
+        epoch_mjd: The modified Julian date of the elements
+        min_elevation: The minimum elevation of a contact in degrees, either one value for all antennas or one per
+            antenna in the order of stations
+    '''
+
+    def __init__(
+        self,
+        elements: dict[str, dict],
+        stations: dict[str, tuple[float, float, float]],
+        epoch_mjd: float,
+        min_elevation: float | list[float] = 10.,
+    ):
+        self.targets = list(elements)
+        self.elements = list(elements.values())
+        self.antennas = list(stations)
+        locations = np.array(list(stations.values()), dtype=float).reshape(-1, 3)
+        self.station_positions, self.station_up = station_frames(locations)
+        self.epoch_mjd = epoch_mjd
+        self.min_elevation = min_elevation
+
+    def _mjd(self, mjd_start: float, n_steps: int, resolution_seconds: float) -> np.ndarray:
+        return mjd_start + np.arange(n_steps) * resolution_seconds / 86400
+
+    def positions(self, mjd_start: float, n_steps: int, resolution_seconds: float) -> np.ndarray:
+        '''
+        Inertial positions of the targets in km over a horizon, with shape (target, time, 3)
+        '''
+        mjd = self._mjd(mjd_start, n_steps, resolution_seconds)
+        return propagate(self.elements, (mjd - self.epoch_mjd) * 86400)
+
+    def visibility(self, mjd_start: float, n_steps: int, resolution_seconds: float) -> np.ndarray:
+        '''
+        Whether each target is visible from each antenna over a horizon, with shape (antenna, target, time)
+        '''
+        mjd = self._mjd(mjd_start, n_steps, resolution_seconds)
+        fixed = inertial_to_fixed(propagate(self.elements, (mjd - self.epoch_mjd) * 86400), mjd)
+        return elevation_mask(fixed, self.station_positions, self.station_up, self.min_elevation)
+
+    def projected_contacts(
+        self,
+        mjd_start: float,
+        n_steps: int,
+        resolution_seconds: float,
+    ) -> dict[str, dict[str, np.ndarray]]:
+        '''
+        Predicted contacts over a horizon in the form of the `projectedContacts` of the `ContactScheduler` block
+        '''
+        visible = self.visibility(mjd_start, n_steps, resolution_seconds)
+        return {
+            antenna: dict(zip(self.targets, per_target))
+            for antenna, per_target in zip(self.antennas, visible)
+        }
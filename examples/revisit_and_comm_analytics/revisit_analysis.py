@@ -1,23 +1,50 @@
 from datetime import datetime
 from itertools import groupby
+from typing import TYPE_CHECKING, Any
 
 import pandas as pd
-from IPython.display import display
-from ipywidgets import IntProgress
-from sedaro import SedaroAgentResult
-from sedaro.modsim import mjd_to_datetime
+
+if TYPE_CHECKING:
+    from sedaro import SedaroAgentResult
+
+STATISTICS_COLUMNS = [
+    "Target",
+    "Average Duration",
+    "Total Duration",
+    "Number of Revisits",
+    "Min. Time Between Revisits",
+    "Max. Time Between Revisits",
+]
+
+
+class _HiddenProgress:
+    """Stand-in for a progress bar that is not shown."""
+    value = 0
+
+
+def _progress_bar(maximum: int, show: bool) -> Any:
+    """Display a progress bar, importing the widgets only then so the sweep worker processes start without them."""
+    if not show:
+        return _HiddenProgress()
+    from IPython.display import display
+    from ipywidgets import IntProgress
+
+    bar = IntProgress(min=0, max=maximum, layout={'width': '100%'})
+    display(bar)
+    return bar
 
 
 def target_revisit_results(
-    observer_results: dict[str, SedaroAgentResult],
+    observer_results: dict[str, 'SedaroAgentResult'],
     revisit_condition_ids: dict[str, str],
     target_names_by_id: dict[str, str],
     observer_to_target_mapping: dict[str, dict[str, str]],
+    show_progress: bool = True,
 ) -> pd.DataFrame:
     """Extract revisit data from observer results."""
+    from sedaro.modsim import mjd_to_datetime
 
-    bar = IntProgress(min=0, max=len(observer_results), layout={'width': '100%'})
-    display(bar)
+    bar = _progress_bar(len(observer_results), show_progress)
 
     revisits: list[dict[str, datetime | str]] = []
     for agent, agent_results in observer_results.items():
@@ -50,13 +77,13 @@ def target_revisit_results(
 
 def target_revisit_statistics(
     revisits: pd.DataFrame,
+    show_progress: bool = True,
 ) -> pd.DataFrame:
     """Calculate revisit statistics for each target and the total."""
 
     unique_targets = revisits["Target"].unique()
 
-    bar = IntProgress(min=0, max=len(unique_targets) + 1, layout={'width': '100%'})
-    display(bar)
+    bar = _progress_bar(len(unique_targets) + 1, show_progress)
 
     revisits.sort_values(by=["Start", "End"], inplace=True)
     revisit_statistics: list[dict[str, float]] = []
@@ -85,4 +112,4 @@ def target_revisit_statistics(
 
     bar.value += 1
 
-    return pd.DataFrame(revisit_statistics)
+    return pd.DataFrame(revisit_statistics, columns=STATISTICS_COLUMNS)
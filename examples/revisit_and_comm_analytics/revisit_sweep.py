@@ -0,0 +1,161 @@
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple
+
+import pandas as pd
+
+from revisit_analysis import STATISTICS_COLUMNS, _progress_bar, target_revisit_results, target_revisit_statistics
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # for the helpers shared between notebooks
+from common.results_cache import ResultsCache  # noqa: E402
+
+# The analysis worker processes import this module, so the widgets and the Sedaro client are only imported where used
+if TYPE_CHECKING:
+    from sedaro import SedaroApiClient, SimulationResult
+
+
+class SweepJob(NamedTuple):
+    """A single simulation job in a parameter sweep."""
+    label: str
+    scenario_branch_id: str
+    job_id: str
+
+
+class SedaroResultsProvider:
+    """Fetch sweep results from the Sedaro service."""
+
+    def __init__(self, client: 'SedaroApiClient'):
+        self.client = client
+
+    def __call__(self, job: SweepJob) -> 'SimulationResult':
+        return self.client.scenario(job.scenario_branch_id).simulation.results(job_id=job.job_id)
+
+
+class CachedResultsProvider:
+    """Fetch sweep results through the on-disk results cache shared by the notebooks, downloading each job only once.
+
+    Cached results are memory-mapped, so only the series the analysis reads are loaded, and they are sent to the
+    analysis worker processes as a reference to the cache rather than as data.
+    """
+
+    def __init__(self, client: 'SedaroApiClient', cache: ResultsCache | None = None):
+        self.client = client
+        self.cache = cache or ResultsCache()
+
+    def __call__(self, job: SweepJob) -> 'SimulationResult':
+        return self.cache.results(self.client, job.scenario_branch_id, job.job_id)
+
+
+class LocalResultsProvider:
+    """Stand-in provider that loads results previously written with `SimulationResult.save`.
+
+    Results are expected at `<directory>/<scenario_branch_id>/<job_id>`, which is where `save_sweep_results` puts them.
+    """
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+
+    def path(self, job: SweepJob) -> Path:
+        return self.directory / job.scenario_branch_id / job.job_id
+
+    def __call__(self, job: SweepJob) -> 'SimulationResult':
+        from sedaro import SimulationResult
+
+        return SimulationResult.load(str(self.path(job)))
+
+
+def save_sweep_results(
+    jobs: list[SweepJob],
+    provider: Callable[[SweepJob], 'SimulationResult'],
+    directory: str | Path,
+    max_fetch_workers: int = 4,
+) -> LocalResultsProvider:
+    """Download the results of each job once and save them for use with a `LocalResultsProvider`."""
+    local = LocalResultsProvider(directory)
+
+    def fetch_and_save(job: SweepJob):
+        path = local.path(job)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            provider(job).save(str(path))
+
+    with ThreadPoolExecutor(max_workers=max_fetch_workers) as pool:
+        list(pool.map(fetch_and_save, jobs))
+    return local
+
+
+def _job_revisit_analysis(label: str, revisit_inputs: dict[str, Any]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Worker process entry point: revisits and revisit statistics for one job, labeled with the job."""
+    revisits = target_revisit_results(**revisit_inputs, show_progress=False)
+    if revisits.empty:
+        # A job without revisits still has a total, so it is kept in the comparison of the sweep
+        no_duration = pd.Series([pd.NaT], dtype="timedelta64[ns]")
+        statistics = pd.DataFrame({
+            "Target": ["Total"],
+            "Average Duration": no_duration,
+            "Total Duration": no_duration,
+            "Number of Revisits": [0],
+            "Min. Time Between Revisits": no_duration,
+            "Max. Time Between Revisits": no_duration,
+        }, columns=STATISTICS_COLUMNS)
+    else:
+        statistics = target_revisit_statistics(revisits, show_progress=False)
+    revisits.insert(0, "Job", label)
+    statistics.insert(0, "Job", label)
+    return revisits, statistics
+
+
+def revisit_sweep(
+    jobs: list[SweepJob],
+    provider: Callable[[SweepJob], 'SimulationResult'],
+    revisit_inputs: Callable[[SweepJob, 'SimulationResult'], dict[str, Any]],
+    max_fetch_workers: int = 4,
+    max_workers: int | None = None,
+    show_progress: bool = True,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Run the revisit analysis over many simulation jobs and merge the results into job-labeled tables.
+
+    Results are fetched concurrently by at most `max_fetch_workers` threads. As soon as a job's results arrive,
+    `revisit_inputs` turns them into the keyword arguments of `target_revisit_results` (`observer_results`,
+    `revisit_condition_ids`, `target_names_by_id`, and `observer_to_target_mapping`), and the analysis of that job runs
+    in a pool of `max_workers` worker processes while the remaining downloads continue. A progress bar of the analyzed
+    jobs is shown unless `show_progress` is False, such as outside of a notebook.
+
+    Returns the revisits and revisit statistics of every job, each with a leading "Job" column holding the job label.
+    """
+    bar = _progress_bar(len(jobs), show_progress)
+
+    # Jobs are tracked by position, since nothing stops two jobs from sharing a label
+    analyses: dict[int, Future] = {}
+    with ThreadPoolExecutor(max_workers=max_fetch_workers) as fetch_pool, \
+            ProcessPoolExecutor(max_workers=max_workers) as analysis_pool:
+        fetches = {fetch_pool.submit(provider, job): i for i, job in enumerate(jobs)}
+        pending = set(fetches)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = fetches[future]
+                inputs = revisit_inputs(jobs[i], future.result())
+                analysis = analysis_pool.submit(_job_revisit_analysis, jobs[i].label, inputs)
+                analysis.add_done_callback(lambda _: setattr(bar, 'value', bar.value + 1))
+                analyses[i] = analysis
+
+        # Merge in the order the jobs were given so the comparison table is stable
+        results = [analyses[i].result() for i in range(len(jobs))]
+
+    revisits = pd.concat([revisits for revisits, _ in results], ignore_index=True)
+    statistics = pd.concat([statistics for _, statistics in results], ignore_index=True)
+    return revisits, statistics
+
+
+def revisit_sweep_comparison(statistics: pd.DataFrame, target: str = "Total") -> pd.DataFrame:
+    """Side-by-side comparison of one target's revisit statistics (by default the total) for each job in a sweep.
+
+    The comparison is indexed by job label, so the labels of the jobs must be unique.
+    """
+    comparison = statistics[statistics["Target"] == target].drop(columns="Target")
+    duplicates = comparison["Job"][comparison["Job"].duplicated()].unique()
+    if len(duplicates):
+        raise ValueError(f"Jobs must have unique labels to be compared, but these repeat: {list(duplicates)}")
+    return comparison.set_index("Job")
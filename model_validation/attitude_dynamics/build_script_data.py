@@ -8,9 +8,14 @@ of scenario_branch and template_branch below.
 '''
 import json
 import os
+import sys
+from pathlib import Path
 
 import numpy as np
-from utils import sedaroLogin
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # for the helpers shared between notebooks
+from common.bootstrap import client  # noqa: E402
+from common.results_cache import ResultsCache  # noqa: E402
 
 # Script settings
 
@@ -19,7 +24,7 @@ template_branch = ''
 outfile = 'simulation_data/sedaro_data.json'
 
 # Initialize the Sedaro API client
-sedaro = sedaroLogin()
+sedaro = client()
 
 # Get the ids of the reaction wheels
 vehicle = sedaro.agent_template(template_branch)
@@ -34,7 +39,7 @@ wheel_inertia = vehicle.block(x_wheel_id).inertia
 
 # Next, get the reaction wheel commands from the scenario simulation results
 results = {}
-simulation_results = sedaro.scenario(scenario_branch).simulation.results()
+simulation_results = ResultsCache().results(sedaro, scenario_branch)
 for i, agent_id in enumerate(simulation_results.templated_agents):
     agent_results = simulation_results.agent(agent_id)
     elapsed_times = agent_results.block(
@@ -45,14 +50,14 @@ for i, agent_id in enumerate(simulation_results.templated_agents):
     position = agent_results.block('root').position.eci.values
     velocity = agent_results.block('root').velocity.values
     attitude_body_eci = agent_results.block('root').attitude.body_eci.values
-    results[agent_id] = {
-        'elapsed_times': elapsed_times,
-        'x_torque': x_torque,
-        'y_torque': y_torque,
-        'z_torque': z_torque,
-        'position': position,
-        'velocity': velocity,
-        'attitude': attitude_body_eci,
+    results[agent_id] = {  # cached series are numpy arrays
+        'elapsed_times': np.asarray(elapsed_times).tolist(),
+        'x_torque': np.asarray(x_torque).tolist(),
+        'y_torque': np.asarray(y_torque).tolist(),
+        'z_torque': np.asarray(z_torque).tolist(),
+        'position': np.asarray(position).tolist(),
+        'velocity': np.asarray(velocity).tolist(),
+        'attitude': np.asarray(attitude_body_eci).tolist(),
     }
 
 
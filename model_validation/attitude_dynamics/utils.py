@@ -1,10 +1,7 @@
-import json
 from pathlib import Path
 from typing import Tuple
 
 import numpy as np
-import requests
-from sedaro import SedaroApiClient
 
 
 def progress_bar(progress):
@@ -101,15 +98,9 @@ def angleBetweenClosestQuaternions(q_1: np.ndarray, t_1: float,
     return angleBetweenQuaternion(q_1, qs_2[findClosestIndex(t_1, ts_2)])
 
 
-def sedaroLogin():
-    with open('../../secrets.json', 'r') as file:
-        API_KEY = json.load(file)['API_KEY']
-    with open('../../config.json', 'r') as file:
-        HOST = json.load(file)['HOST']
-    return SedaroApiClient(api_key=API_KEY, host=HOST)
-
-
 def download_file(url: str, path: str):
+    import requests
+
     path_ = Path(path)
     path_.parent.mkdir(parents=True, exist_ok=True)
     with open(path, "wb") as file:
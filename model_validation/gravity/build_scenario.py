@@ -7,27 +7,24 @@ Use caution if trying to run this script -- it will make modifications to the
 target branch that could result in data loss.
 '''
 import json
+import sys
 from pathlib import Path
 
-from sedaro import SedaroApiClient
-
 PATH = Path(__file__).parent
+sys.path.insert(0, str(PATH.resolve().parents[1]))  # for the helpers shared between notebooks
+from common.bootstrap import client  # noqa: E402
+from common.scenario_sync import sync_blocks  # noqa: E402
 
 SCENARIO_ID = 'PLCPJHKtysym8fHJVxslm3'
 
 if __name__ == '__main__':
 
-    # Load API key
-    with open(PATH / '../../secrets.json', 'r') as file:
-        API_KEY = json.load(file)['API_KEY']
-
     # Load the orbit configurations
     with open(PATH / 'orbits.json', 'r') as file:
         orbits = json.load(file)
 
     # Initialize API client
-    sedaro = SedaroApiClient(API_KEY, host='https://api.sedaro.com')
-    scenario = sedaro.scenario(SCENARIO_ID)
+    scenario = client('https://api.sedaro.com').scenario(SCENARIO_ID)
 
     # Build new agent blocks
     blocks = []
@@ -62,8 +59,7 @@ if __name__ == '__main__':
             }
         blocks += [orbit, agent]
 
-    # Delete existing agents and create new ones
-    existing = scenario.Agent.get_all()
-    if existing:
-        scenario.update(delete=[entry.id for entry in existing])
-    scenario.update(blocks=blocks)
+    # Create, update, and delete agents and their orbits to match the configurations, sending only what changed
+    result = sync_blocks(scenario, blocks, types=['PeripheralSpacePoint', 'TemplatedAgent'])
+    print(f'Created {result.created}, updated {result.updated}, and deleted {result.deleted} blocks '
+          f'in {result.requests} requests')
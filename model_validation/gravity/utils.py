@@ -3,8 +3,6 @@ Miscellaneous tools for performing the validation analysis.
 '''
 import re
 
-import matplotlib.pyplot as plt
-
 
 def progress_bar(progress):
     """Prints a progress bar to the console"""
@@ -15,6 +13,8 @@ def progress_bar(progress):
 
 
 def plot_results(data, name, plot_description):
+    import matplotlib.pyplot as plt  # only when plotting, so build_gmat_script.py doesn't load matplotlib
+
     count = 0
     for agent_name in data:
         if re.match(f'{name}_\\d+', agent_name):